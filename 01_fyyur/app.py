@@ -2,134 +2,278 @@
 # Imports
 #----------------------------------------------------------------------------#
 
-import json
+import os
 import sys
-import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, jsonify
-from flask_moment import Moment
-from flask_sqlalchemy import SQLAlchemy
+import tempfile
+import click
+from flask import Blueprint, Flask, current_app, render_template, request, Response, flash, redirect, url_for, abort, jsonify, stream_with_context
+from flask.cli import with_appcontext
 import logging
 from logging import Formatter, FileHandler
-from flask_wtf import Form
-from forms import *
+from forms import VenueForm, ArtistForm, ShowForm, TourForm, genre_choices
 from datetime import datetime
-import pdb
-from flask_migrate import Migrate
+from collections import namedtuple
+from functools import lru_cache
+from itertools import groupby
+from extensions import db, view_cache, query_stats, assets
+from models import Venue, Artist, Show, refresh_show_counters, rollover_show_counters
+from assets import build_assets_command
+from bulk_import import import_command
+from partitions import show_partitions_command
+from scheduling import ShowConflict, check_show_times, default_end_time, \
+    find_venue_conflict, is_exclusion_violation, show_conflicts_command
+from tours import TourError, create_tour, parse_stops, stop_as_json, tour_from_json
+
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
 
-app = Flask(__name__)
-moment = Moment(app)
-app.config.from_object('config')
-db = SQLAlchemy(app)
-migrate = Migrate(app,db)
+bp = Blueprint('main', __name__)
+
+def create_app(config='config'):
+  # nothing is built at import time: gunicorn --preload calls this once in
+  # the master (see wsgi.py) and the workers share the result copy-on-write.
+  # Migrations and moment.js are only needed once an app exists, so their
+  # imports wait until here
+  from flask_migrate import Migrate
+  from flask_moment import Moment
+
+  app = Flask(__name__)
+  app.config.from_object(config)
+  if not app.config.get('SECRET_KEY'):
+    app.config['SECRET_KEY'] = load_secret_key(app.instance_path)
+
+  db.init_app(app)
+  Migrate(app, db)
+  Moment(app)
+  view_cache.init_app(app)
+  query_stats.init_app(app)
+  assets.init_app(app)
+
+  app.register_blueprint(bp)
+  app.jinja_env.filters['datetime'] = format_datetime
+  app.cli.add_command(import_command)
+  app.cli.add_command(show_conflicts_command)
+  app.cli.add_command(show_partitions_command)
+  app.cli.add_command(rollover_shows_command)
+  app.cli.add_command(build_assets_command)
+
+  # app.logger is the 'app' logger of every app built here (tests, scripts):
+  # it gets its file handler once
+  if not app.debug and not any(isinstance(handler, FileHandler) for handler in app.logger.handlers):
+    file_handler = FileHandler('error.log')
+    file_handler.setFormatter(
+        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+    )
+    app.logger.setLevel(logging.INFO)
+    file_handler.setLevel(logging.INFO)
+    app.logger.addHandler(file_handler)
+    app.logger.info('errors')
+  return app
+
+def load_secret_key(instance_path):
+  # without SECRET_KEY in the environment, a key generated once and kept in
+  # the instance folder, so every worker and every restart signs sessions
+  # with the same key. Workers started together race to create it: each
+  # writes a candidate to a temporary file and links it into place, so the
+  # key file only ever appears complete and the first link wins
+  path = os.path.join(instance_path, 'secret_key')
+  os.makedirs(instance_path, exist_ok=True)
+  if not os.path.exists(path):
+    fd, candidate = tempfile.mkstemp(dir=instance_path)
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(os.urandom(32))
+      try:
+        os.link(candidate, path)
+      except FileExistsError:
+        pass
+    finally:
+      os.remove(candidate)
+  with open(path, 'rb') as f:
+    return f.read()
+
+def preload():
+  # caches otherwise filled on the first request of each worker
+  for format in DATETIME_FORMATS:
+    datetime_pattern(format, None)
 
 #----------------------------------------------------------------------------#
-# Models
+# Filters.
 #----------------------------------------------------------------------------#
 
-from models import *
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+    'short': "MM/dd/y, HH:mm",
+}
+
+@lru_cache(maxsize=None)
+def datetime_pattern(format, locale):
+    # parsing the babel pattern and the locale is the expensive part, do it
+    # once per (format, locale). babel itself is already loaded: flask_wtf
+    # imports it along with forms.py
+    from babel import Locale
+    from babel.dates import LC_TIME, parse_pattern
+    return parse_pattern(DATETIME_FORMATS.get(format, format)), Locale.parse(locale or LC_TIME)
+
+def format_datetime(value, format='medium', locale=None):
+    if not isinstance(value, datetime):
+        import dateutil.parser
+        value = dateutil.parser.parse(value)
+    pattern, locale = datetime_pattern(format, locale)
+    return pattern.apply(value, locale)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Streaming.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-    
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    
-    return babel.dates.format_datetime(date, format)
+def streamed(endpoint):
+  # per-view switch, see STREAMED_VIEWS in config.py
+  return endpoint in current_app.config['STREAMED_VIEWS']
 
-app.jinja_env.filters['datetime'] = format_datetime
+def stream_template(template_name, **context):
+  # Flask 1.1 has no stream_template: render through Jinja's generator so the
+  # first bytes go out while the rows are still being fetched
+  current_app.update_template_context(context)
+  stream = current_app.jinja_env.get_template(template_name).stream(context)
+  stream.enable_buffering(current_app.config['STREAM_BUFFER_SIZE'])
+  return Response(stream_with_context(stream))
 
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-@app.route('/')
+@bp.route('/')
 def index():
   return render_template('pages/home.html')
 
 
+#  Genres
+#  ----------------------------------------------------------------
+
+def genre_criteria(model, genre):
+  # array containment, answered by the GIN index on genres
+  return [model.genres.contains([genre])] if genre else []
+
+def genre_facets(model, *criteria):
+  # per-genre counts over the rows matching criteria, in a single pass: one
+  # filtered count per genre choice
+  counts = db.session.query(*[db.func.count(model.id).filter(model.genres.contains([genre]))
+                              for genre, _ in genre_choices]).\
+      filter(*criteria).\
+      one()
+  return [{"genre": genre, "count": count}
+          for (genre, _), count in zip(genre_choices, counts) if count]
+
+def facet_links(facets, selected, **args):
+  # facet counts with the url that selects (or clears) each genre
+  return [dict(facet, selected=facet["genre"] == selected,
+               url=url_for(request.endpoint, genre=None if facet["genre"] == selected else facet["genre"], **args))
+          for facet in facets]
+
+
 #  Venues
 #  ----------------------------------------------------------------
-def removeDuplicates(lst): 
-    return [t for t in (set(tuple(i) for i in lst))] 
 
-@app.route('/venues')
-def venues():
-  query_data = Venue.query.order_by("id").all()
-  locs = [(e.city,e.state) for e in query_data]
-  locs = removeDuplicates(locs)
-  
+def iter_venue_areas(genre=None):
+  # one query over the venue rows, ordered so that venues of the same area
+  # are adjacent; upcoming-show counts are read from the counter column
+  rows = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_shows_count).\
+      filter(*genre_criteria(Venue, genre)).\
+      order_by(Venue.state, Venue.city, Venue.id).\
+      yield_per(current_app.config['STREAM_BATCH_SIZE'])
+
   #group-by city and state
-  data = []
-  for loc in locs:
-    interim = {
-      "city":loc[0],
-      "state":loc[1],
-      "venues":[]}
-
-    for e in query_data:
-      if (e.city,e.state) == loc:
-          interim["venues"].append( {
-            "id":e.id,
-            "name":e.name,
-            "num_upcoming_shows": len(e.shows)
-          })
-    data.append(interim)
-  return render_template('pages/venues.html', areas=data)
-
-@app.route('/venues/search', methods=['POST'])
-def search_venues():
-  
-  search_term=request.form.get('search_term', '')
-  q = Venue.query.order_by("id").all()
-  data = []
-  for e in q:
-    if search_term.lower() in e.name.lower():
-      data.append({
-        "id": e.id,
-        "name": e.name,
-        "num_upcoming_shows": len([k for k in e.shows if k.start_time > datetime.now()])
-      })
-
-  response={
-    "count": 1,
-    "data": data
-  }
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  for (city, state), group in groupby(rows, key=lambda r: (r[0], r[1])):
+    yield {
+      "city": city,
+      "state": state,
+      "venues": [{
+        "id": venue_id,
+        "name": name,
+        "num_upcoming_shows": num_upcoming_shows
+      } for _, _, venue_id, name, num_upcoming_shows in group]}
+
+@view_cache.memoize('venue', 'show')
+def venue_areas(genre):
+  return list(iter_venue_areas(genre))
+
+@view_cache.memoize('venue')
+def venue_genre_facets():
+  return genre_facets(Venue)
+
+@bp.route('/venues')
+def venues():
+  genre = request.args.get('genre') or None
+  facets = facet_links(venue_genre_facets(), genre)
+  if streamed('venues'):
+    return stream_template('pages/venues.html', areas=iter_venue_areas(genre), facets=facets)
+  return render_template('pages/venues.html', areas=venue_areas(genre), facets=facets)
+
+def search_by_name(model, search_term, genre=None):
+  # case-insensitive substring match on the name; on Postgres the ILIKE is
+  # answered by the trigram index, and the total number of matches comes
+  # back with the rows as a window count
+  pattern = '%' + search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+  matches = model.name.ilike(pattern, escape='\\')
+  rows = db.session.query(model.id, model.name, model.upcoming_shows_count, db.func.count().over()).\
+      filter(matches, *genre_criteria(model, genre)).\
+      order_by(model.name, model.id).\
+      limit(current_app.config['SEARCH_RESULTS_LIMIT']).\
+      all()
 
-@app.route('/venues/<int:venue_id>')
-def show_venue(venue_id):
-  # shows the venue page with the given venue_id
+  return {
+    "count": rows[0][3] if rows else 0,
+    "data": [{
+      "id": e_id,
+      "name": name,
+      "num_upcoming_shows": num_upcoming_shows
+    } for e_id, name, num_upcoming_shows, _ in rows],
+    "facets": facet_links(genre_facets(model, matches), genre, search_term=search_term)
+  }
 
-  d = Venue.query.get(venue_id)
-  past_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-      filter(
-          Show.venue_id == venue_id,
-          Show.artist_id == Artist.id,
-          Show.start_time < datetime.now()
-      ).\
-      all()
-  upcoming_shows = db.session.query(Artist,Show).join(Show).join(Venue).\
-    filter(
-      Show.venue_id == venue_id,
-      Show.artist_id == Artist.id,
-      Show.start_time > datetime.now()
-    ).\
+@bp.route('/venues/search', methods=['GET', 'POST'])
+def search_venues():
+  search_term = request.values.get('search_term', '')
+  response = search_by_name(Venue, search_term, request.values.get('genre') or None)
+  return render_template('pages/search_venues.html', results=response, search_term=search_term)
+
+def split_shows(entity_id_column, entity_id, other):
+  # every show of one venue/artist in a single query, split against a single
+  # timestamp: upcoming shows first (soonest first), then past shows (most
+  # recent first), capped at DETAIL_SHOWS_LIMIT rows; the window counts
+  # carry the uncapped totals on every row
+  now = datetime.now()
+  is_past = Show.start_time < now
+  rows = db.session.query(Show.start_time, other.id, other.name, other.image_link,
+                          db.func.count(Show.id).filter(is_past).over(),
+                          db.func.count(Show.id).filter(db.not_(is_past)).over()).\
+      select_from(Show).\
+      join(other).\
+      filter(entity_id_column == entity_id).\
+      order_by(is_past, db.case([(db.not_(is_past), Show.start_time)]), Show.start_time.desc()).\
+      limit(current_app.config['DETAIL_SHOWS_LIMIT']).\
       all()
 
+  past_shows, upcoming_shows = [], []
+  for row in rows:
+    (past_shows if row[0] < now else upcoming_shows).append(row[:4])
+  past_count, upcoming_count = (rows[0][4], rows[0][5]) if rows else (0, 0)
+  return past_shows, upcoming_shows, past_count, upcoming_count
+
+# 'show' too: a shows import or a rollover changes the show lists without
+# bumping the venues they belong to
+@view_cache.memoize('venue:{0}', 'artist', 'show')
+def venue_details(venue_id):
+  d = Venue.query.get_or_404(venue_id)
+  past_shows, upcoming_shows, past_count, upcoming_count = \
+      split_shows(Show.venue_id, venue_id, Artist)
+
   data = {
     "id": d.id,
     "name":d.name,
-    "genres": d.genres,
+    "genres": d.genres or [],
     "address":d.address,
     "city": d.city,
     "state":d.state,
@@ -139,32 +283,36 @@ def show_venue(venue_id):
     "seeking_talent":d.seeking_talent,
     "image_link":d.image_link,
     "past_shows": [{
-            'artist_id': artist.id,
-            "artist_name": artist.name,
-            "artist_image_link": artist.image_link,
-            "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-        } for artist, show in past_shows],
+      "artist_id": artist_id,
+      "artist_name": artist_name,
+      "artist_image_link": artist_image_link,
+      "start_time": start_time
+    } for start_time, artist_id, artist_name, artist_image_link in past_shows],
     "upcoming_shows": [{
-      'artist_id': artist.id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-    } for artist, show in upcoming_shows],
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows)
+      "artist_id": artist_id,
+      "artist_name": artist_name,
+      "artist_image_link": artist_image_link,
+      "start_time": start_time
+    } for start_time, artist_id, artist_name, artist_image_link in upcoming_shows],
+    "past_shows_count": past_count,
+    "upcoming_shows_count": upcoming_count
   }
- 
-  return render_template('pages/show_venue.html', venue=data)
+  return data
+
+@bp.route('/venues/<int:venue_id>')
+def show_venue(venue_id):
+  # shows the venue page with the given venue_id
+  return render_template('pages/show_venue.html', venue=venue_details(venue_id))
 
 #  Create Venue
 #  ----------------------------------------------------------------
 
-@app.route('/venues/create', methods=['GET'])
+@bp.route('/venues/create', methods=['GET'])
 def create_venue_form():
   form = VenueForm()
   return render_template('forms/new_venue.html', form=form)
 
-@app.route('/venues/create', methods=['POST'])
+@bp.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   error = False
   try:
@@ -186,6 +334,7 @@ def create_venue_submission():
     #Add to database
     db.session.add(el)
     db.session.commit()
+    view_cache.bump('venue')
     #on successful db insert, flash success
     flash('Venue ' + request.form['name'] + ' was successfully listed!')
   except:
@@ -203,13 +352,18 @@ def create_venue_submission():
     return render_template('pages/home.html')
   
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@bp.route('/venues/<venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
   #  BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
   # clicking that button delete it from the db then redirect the user to the homepage
   try:
+    artist_ids = [artist_id for artist_id, in
+                  db.session.query(Show.artist_id).filter_by(venue_id=venue_id).distinct()]
+    Show.query.filter_by(venue_id=venue_id).delete()
     Venue.query.filter_by(id=venue_id).delete()
+    refresh_show_counters(artist_ids=artist_ids)
     db.session.commit()
+    view_cache.bump('venue', f'venue:{venue_id}', 'show')
   except:
     db.session.rollback()
   finally:
@@ -218,68 +372,49 @@ def delete_venue(venue_id):
 
 #  Artists
 #  ----------------------------------------------------------------
-@app.route('/artists')
+def iter_artists(genre=None):
+  rows = db.session.query(Artist.id, Artist.name).\
+      filter(*genre_criteria(Artist, genre)).\
+      order_by(Artist.id).\
+      yield_per(current_app.config['STREAM_BATCH_SIZE'])
+  for artist_id, name in rows:
+    yield {
+      "id": artist_id,
+      "name": name
+    }
+
+@view_cache.memoize('artist')
+def artist_list(genre):
+  return list(iter_artists(genre))
+
+@view_cache.memoize('artist')
+def artist_genre_facets():
+  return genre_facets(Artist)
+
+@bp.route('/artists')
 def artists():
-  artist = Artist.query.order_by("id").all()
-  data = []
-  for e in artist:
-    data.append({
-      "id":e.id,
-      "name":e.name
-    })
-  
-  return render_template('pages/artists.html', artists=data)
+  genre = request.args.get('genre') or None
+  facets = facet_links(artist_genre_facets(), genre)
+  if streamed('artists'):
+    return stream_template('pages/artists.html', artists=iter_artists(genre), facets=facets)
+  return render_template('pages/artists.html', artists=artist_list(genre), facets=facets)
 
-@app.route('/artists/search', methods=['POST'])
+@bp.route('/artists/search', methods=['GET', 'POST'])
 def search_artists():
+  search_term = request.values.get('search_term', '')
+  response = search_by_name(Artist, search_term, request.values.get('genre') or None)
+  return render_template('pages/search_artists.html', results=response, search_term=search_term)
 
-  search_term=request.form.get('search_term', '')
-  q = Artist.query.order_by("id").all()
-  data = []
-  for e in q:
-    if search_term.lower() in e.name.lower():
-      data.append({
-        "id": e.id,
-        "name": e.name,
-        "num_upcoming_shows": len([k for k in e.shows if k.start_time > datetime.now()])
-      })
-
-  response={
-    "count": len(data),
-    "data": data
-  }
-  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
-
-def fix_json_array(arr):
-    if len(arr) > 1 and arr[0] == '{':
-        arr = arr[1:-1]
-        arr = ''.join(arr).split(",")
-        return(arr)
-
-@app.route('/artists/<int:artist_id>')
-def show_artist(artist_id):
-  d = Artist.query.get(artist_id)
-
-  past_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-      filter(
-          Show.venue_id == Venue.id,
-          Show.artist_id == Artist.id,
-          Show.start_time < datetime.now()
-      ).\
-      all()
-
-  upcoming_shows = db.session.query(Venue, Show).join(Show).join(Artist).\
-      filter(
-          Show.venue_id == Venue.id,
-          Show.artist_id == Artist.id,
-          Show.start_time > datetime.now()
-      ).\
-      all()
+@view_cache.memoize('artist:{0}', 'venue', 'show')
+def artist_details(artist_id):
+  d = Artist.query.get_or_404(artist_id)
+  past_shows, upcoming_shows, past_count, upcoming_count = \
+      split_shows(Show.artist_id, artist_id, Venue)
 
   data = {
     "id": d.id,
     "name": d.name,
-    "genres": fix_json_array(d.genres),
+    "genres": d.genres or [],
     "city": d.city,
     "state": d.state,
     "phone": d.phone,
@@ -289,33 +424,36 @@ def show_artist(artist_id):
     "seeking_description": d.seeking_description,
     "image_link": d.image_link,
     "past_shows": [{
-      "venue_id":venue.id,
-      "venue_name":venue.name,
-      "venue_image_link":venue.image_link,
-      "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-    } for venue, show in past_shows],
+      "venue_id": venue_id,
+      "venue_name": venue_name,
+      "venue_image_link": venue_image_link,
+      "start_time": start_time
+    } for start_time, venue_id, venue_name, venue_image_link in past_shows],
     "upcoming_shows": [{
-      "venue_id":venue.id,
-      "venue_name":venue.name,
-      "venue_image_link":venue.image_link,
-      "start_time": show.start_time.strftime("%m/%d/%Y, %H:%M")
-    } for venue, show in upcoming_shows],
-    "past_shows_count": len(past_shows),
-    "upcoming_shows_count": len(upcoming_shows)
+      "venue_id": venue_id,
+      "venue_name": venue_name,
+      "venue_image_link": venue_image_link,
+      "start_time": start_time
+    } for start_time, venue_id, venue_name, venue_image_link in upcoming_shows],
+    "past_shows_count": past_count,
+    "upcoming_shows_count": upcoming_count
   }
+  return data
 
-  return render_template('pages/show_artist.html', artist=data)
+@bp.route('/artists/<int:artist_id>')
+def show_artist(artist_id):
+  return render_template('pages/show_artist.html', artist=artist_details(artist_id))
 
 #  Update
 #  ----------------------------------------------------------------
-@app.route('/artists/<int:artist_id>/edit', methods=['GET'])
+@bp.route('/artists/<int:artist_id>/edit', methods=['GET'])
 def edit_artist(artist_id):
   form = ArtistForm()
   d = Artist.query.get(artist_id)
   artist={
     "id": d.id,
     "name": d.name,
-    "genres": fix_json_array(d.genres),
+    "genres": d.genres or [],
     "city": d.city,
     "state": d.state,
     "phone": d.phone,
@@ -328,7 +466,7 @@ def edit_artist(artist_id):
 
   return render_template('forms/edit_artist.html', form=form, artist=artist)
 
-@app.route('/artists/<int:artist_id>/edit', methods=['POST'])
+@bp.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   # take values from the form submitted, and update existing
   # artist record with ID <artist_id> using the new attributes
@@ -347,6 +485,7 @@ def edit_artist_submission(artist_id):
     a.seeking_description = request.form['seeking_description']
     #Commit to database
     db.session.commit()
+    view_cache.bump('artist', f'artist:{artist_id}')
     #on successful db insert, flash success
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
   except:
@@ -361,16 +500,16 @@ def edit_artist_submission(artist_id):
     abort(400)
     flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated.')
   else:
-    return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('main.show_artist', artist_id=artist_id))
 
-@app.route('/venues/<int:venue_id>/edit', methods=['GET'])
+@bp.route('/venues/<int:venue_id>/edit', methods=['GET'])
 def edit_venue(venue_id):
   form = VenueForm()
   d = Venue.query.get(venue_id)
   venue={
     "id": d.id,
     "name": d.name,
-    "genres": fix_json_array(d.genres),
+    "genres": d.genres or [],
     "address": d.address,
     "city": d.city,
     "state": d.state,
@@ -383,7 +522,7 @@ def edit_venue(venue_id):
   }
   return render_template('forms/edit_venue.html', form=form, venue=venue)
 
-@app.route('/venues/<int:venue_id>/edit', methods=['POST'])
+@bp.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   # Take values from the form submitted, and update existing
   # venue record with ID <venue_id> using the new attributes
@@ -404,6 +543,7 @@ def edit_venue_submission(venue_id):
 
     #Commit to database
     db.session.commit()
+    view_cache.bump('venue', f'venue:{venue_id}')
     #on successful db insert, flash success
     flash('Venue ' + request.form['name'] + ' was successfully updated!')
   except:
@@ -418,17 +558,17 @@ def edit_venue_submission(venue_id):
     abort(400)
     flash('An error occurred. Venue ' + request.form['name'] + ' could not be updated.')
   else:
-    return redirect(url_for('show_venue', venue_id=venue_id))
+    return redirect(url_for('main.show_venue', venue_id=venue_id))
 
 #  Create Artist
 #  ----------------------------------------------------------------
 
-@app.route('/artists/create', methods=['GET'])
+@bp.route('/artists/create', methods=['GET'])
 def create_artist_form():
   form = ArtistForm()
   return render_template('forms/new_artist.html', form=form)
 
-@app.route('/artists/create', methods=['POST'])
+@bp.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   error = False
   try:
@@ -450,6 +590,7 @@ def create_artist_submission():
     #Add to database
     db.session.add(el)
     db.session.commit()
+    view_cache.bump('artist')
     #on successful db insert, flash success
     flash('Artist ' + request.form['name'] + ' was successfully listed!')
   except:
@@ -470,92 +611,244 @@ def create_artist_submission():
 #  Shows
 #  ----------------------------------------------------------------
 
-@app.route('/shows')
+def encode_show_cursor(start_time, show_id):
+  return start_time.isoformat() + '_' + str(show_id)
+
+def decode_show_cursor(cursor):
+  start_time, show_id = cursor.rsplit('_', 1)
+  return datetime.fromisoformat(start_time), int(show_id)
+
+# optional /shows filters: ?from=&to= (ISO dates or datetimes, [from, to)),
+# ?city=&state= (venue location) and ?genre= (artist genre)
+ShowFilter = namedtuple('ShowFilter', ['start', 'end', 'city', 'state', 'genre'])
+
+def parse_show_filter(args):
+  try:
+    start = datetime.fromisoformat(args['from']) if args.get('from') else None
+    end = datetime.fromisoformat(args['to']) if args.get('to') else None
+  except ValueError:
+    abort(400)
+  return ShowFilter(start, end, args.get('city') or None, args.get('state') or None, args.get('genre') or None)
+
+def show_listing_query(show_filter):
+  # the time window is a range scan on the (start_time, id) index; city and
+  # state narrow it through the (state, city) index on Venue
+  query = db.session.query(Show.id, Show.start_time, Venue.id, Venue.name,
+                           Artist.id, Artist.name, Artist.image_link).\
+      join(Venue, Show.venue_id == Venue.id).\
+      join(Artist, Show.artist_id == Artist.id)
+  if show_filter.start:
+    query = query.filter(Show.start_time >= show_filter.start)
+  if show_filter.end:
+    query = query.filter(Show.start_time < show_filter.end)
+  if show_filter.city:
+    query = query.filter(Venue.city == show_filter.city)
+  if show_filter.state:
+    query = query.filter(Venue.state == show_filter.state)
+  if show_filter.genre:
+    query = query.filter(Artist.genres.contains([show_filter.genre]))
+  return query
+
+def iter_shows(rows):
+  for _, start_time, venue_id, venue_name, artist_id, artist_name, artist_image_link in rows:
+    yield {
+      "venue_id": venue_id,
+      "venue_name": venue_name,
+      "artist_id": artist_id,
+      "artist_name": artist_name,
+      "artist_image_link": artist_image_link,
+      "start_time": start_time
+    }
+
+@view_cache.memoize('show', 'venue', 'artist')
+def show_page(show_filter, cursor):
+  # one page of the /shows listing in (start_time, id) order; the cursor
+  # resumes right after the last show of the previous page so every page
+  # costs the same however deep it is
+  per_page = current_app.config['SHOWS_PER_PAGE']
+  query = show_listing_query(show_filter)
+
+  if cursor:
+    try:
+      after = decode_show_cursor(cursor)
+    except ValueError:
+      abort(400)
+    # the plain bound on start_time is implied by the row comparison but is
+    # what lets Postgres skip the partitions of earlier months
+    query = query.filter(db.tuple_(Show.start_time, Show.id) > db.tuple_(*after),
+                         Show.start_time >= after[0])
+
+  rows = query.order_by(Show.start_time, Show.id).limit(per_page + 1).all()
+  next_cursor = None
+  if len(rows) > per_page:
+    rows = rows[:per_page]
+    next_cursor = encode_show_cursor(rows[-1][1], rows[-1][0])
+
+  return list(iter_shows(rows)), next_cursor
+
+def wants_json():
+  return request.args.get('format') == 'json' or \
+      request.accept_mimetypes.best == 'application/json'
+
+@bp.route('/shows')
 def shows():
-  # displays list of shows at /shows
-
-  shows = Show.query.order_by("id").all()
-  data = []
-  for e in shows:
-    venue = Venue.query.get(e.venue_id)
-    artist = Artist.query.get(e.artist_id)
-    data.append({
-      "venue_id": e.venue_id,
-      "venue_name": venue.name,
-      "artist_id": e.artist_id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": e.start_time
+  # displays list of shows at /shows, or as JSON with ?format=json
+  show_filter = parse_show_filter(request.args)
+  if streamed('shows') and not wants_json():
+    # the whole listing in one streamed response, without pages
+    rows = show_listing_query(show_filter).\
+        order_by(Show.start_time, Show.id).\
+        yield_per(current_app.config['STREAM_BATCH_SIZE'])
+    return stream_template('pages/shows.html', shows=iter_shows(rows), next_url=None)
+
+  data, next_cursor = show_page(show_filter, request.args.get('after'))
+  next_url = None
+  if next_cursor:
+    args = request.args.to_dict()
+    args['after'] = next_cursor
+    next_url = url_for('main.shows', **args)
+
+  if wants_json():
+    return jsonify({
+      "shows": [dict(show, start_time=show["start_time"].isoformat()) for show in data],
+      "next": next_url
     })
+  return render_template('pages/shows.html', shows=data, next_url=next_url)
 
-  return render_template('pages/shows.html', shows=data)
-
-@app.route('/shows/create')
+@bp.route('/shows/create')
 def create_shows():
   # renders form. do not touch.
   form = ShowForm()
   return render_template('forms/new_show.html', form=form)
 
-@app.route('/shows/create', methods=['POST'])
+@bp.route('/shows/create', methods=['POST'])
 def create_show_submission():
   error = False
+  conflict = False
   try:
+    import dateutil.parser
     venue_id = request.form['venue_id']
     artist_id = request.form['artist_id']
-    start_time = request.form['start_time']
-
-    el = Show(venue_id = venue_id , artist_id = artist_id, start_time = start_time)
+    start_time = dateutil.parser.parse(request.form['start_time'])
+    if request.form.get('end_time'):
+      end_time = dateutil.parser.parse(request.form['end_time'])
+    else:
+      end_time = default_end_time(start_time)
+    check_show_times(start_time, end_time)
+
+    #Reject double bookings of the venue
+    if find_venue_conflict(venue_id, start_time, end_time) is not None:
+      raise ShowConflict()
+
+    el = Show(venue_id = venue_id , artist_id = artist_id, start_time = start_time, end_time = end_time)
     
-    #Add to database
+    #Add to database and update the venue and artist counters with it
     db.session.add(el)
+    db.session.flush()
+    refresh_show_counters(venue_ids=[venue_id], artist_ids=[artist_id])
     db.session.commit()
+    view_cache.bump('show', f'venue:{venue_id}', f'artist:{artist_id}')
     #on successful db insert, flash success
     flash('Show  was successfully listed!')
-  except:
+  except Exception as e:
     #Rollback in case of error
     db.session.rollback()
-    error = True
-    print(sys.exc_info())
+    if isinstance(e, ShowConflict) or is_exclusion_violation(e):
+      conflict = True
+    else:
+      error = True
+      print(sys.exc_info())
   finally:
     db.session.close()
 
+  if conflict:
+    flash('The venue is already booked at that time. Show could not be listed.')
+    return render_template('forms/new_show.html', form=ShowForm()), 409
   if error:
     abort(400)
     flash('An error occurred. Show could not be listed.')
   else:
     return render_template('pages/home.html')
 
+@bp.route('/shows/tour')
+def create_tour_form():
+  # one artist, many shows: a venue and start time per line
+  return render_template('forms/new_tour.html', form=TourForm())
+
+@bp.route('/shows/tour', methods=['POST'])
+def create_tour_submission():
+  # accepts the form, or JSON: {"artist_id": 1, "skip_invalid": false,
+  # "shows": [{"venue_id": 2, "start_time": "...", "end_time": "..."}]};
+  # answers with the outcome of every show
+  stops, error = [], None
+  try:
+    if request.is_json:
+      artist_id, stops, skip_invalid = tour_from_json(request.get_json())
+    else:
+      artist_id = request.form.get('artist_id')
+      stops = parse_stops(request.form.get('shows', ''))
+      skip_invalid = bool(request.form.get('skip_invalid'))
+    created = create_tour(artist_id, stops, skip_invalid)
+    status = 201 if created else 422
+  except TourError as e:
+    created, error, status = 0, str(e), 400
+  except ShowConflict:
+    created, error, status = 0, 'a venue was booked at the same time by another request', 409
+  finally:
+    db.session.close()
+
+  if request.is_json or wants_json():
+    return jsonify({
+      "success": created > 0,
+      "created": created,
+      "error": error,
+      "shows": [stop_as_json(stop) for stop in stops]
+    }), status
+  if created:
+    flash(f'{created} shows were successfully listed!')
+  else:
+    flash(f'The tour could not be listed: {error or "some shows were rejected"}.')
+  return render_template('forms/new_tour.html', form=TourForm(), stops=stops), status
+
+
+#  Maintenance
+#  ----------------------------------------------------------------
+
+@click.command('rollover-shows')
+@with_appcontext
+def rollover_shows_command():
+  """Move shows that have started from the upcoming to the past counters."""
+  # run periodically, e.g. from cron: */5 * * * * flask rollover-shows
+  rollover_show_counters()
+  db.session.commit()
+  view_cache.bump('show')
+
+
+@bp.route('/cache/stats')
+def cache_stats():
+  return jsonify(view_cache.stats())
 
-@app.errorhandler(404)
+
+@bp.app_errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
-    )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
-
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    create_app().run()
 
 # Or specify port manually:
 '''
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
 '''
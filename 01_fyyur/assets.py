@@ -0,0 +1,175 @@
+#----------------------------------------------------------------------------#
+# Fingerprinted, precompressed static files.
+#
+#   flask build-assets
+#
+# copies every file of static/ into static/dist/ under a name carrying a
+# hash of its content (css/main.css -> css/main.3f9c2a1b7d.css), with .gz
+# and, if the optional brotli package is installed, .br versions of the
+# text files next to it, and writes static/dist/manifest.json. url() paths
+# in the CSS files are rewritten to the hashed names of the files they
+# point to.
+#
+# Once a manifest exists, url_for('static', filename='css/main.css') gives
+# the hashed URL, and hashed files are served with a year-long immutable
+# Cache-Control, compressed with the best encoding the client accepts. A
+# changed file gets a new name, so clients never need to revalidate.
+# Files the build does not know, or every file without a build, are served
+# by Flask as before. Old hashed files are kept so that pages rendered
+# before a deploy still find theirs; delete static/dist to prune them.
+#----------------------------------------------------------------------------#
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+HASH_LENGTH = 10
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.eot', '.ttf', '.otf', '.json', '.txt', '.html')
+# in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def hashed_name(name, content):
+    root, ext = posixpath.splitext(name)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def source_files(static_folder, dist):
+    # relative posix names of every static file, outside of the build itself
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        if dirpath == static_folder and dist in dirnames:
+            dirnames.remove(dist)
+        for filename in filenames:
+            yield os.path.relpath(os.path.join(dirpath, filename), static_folder).replace(os.sep, '/')
+
+
+def rewrite_css(name, content, files):
+    # point url() references at the hashed files, keeping them relative
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, target = match.groups()
+        if target.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        path, suffix = re.match(r'([^?#]*)(.*)', target).groups()
+        resolved = posixpath.normpath(posixpath.join(base, path))
+        if resolved not in files:
+            return match.group(0)
+        return f'url({quote}{posixpath.relpath(files[resolved], base or ".")}{suffix}{quote})'
+
+    return CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def compress(content):
+    # the compressed versions worth keeping, by encoding
+    variants = {'gzip': gzip.compress(content, 9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants['br'] = brotli.compress(content)
+    return {encoding: data for encoding, data in variants.items() if len(data) < len(content)}
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def build_assets(static_folder, dist):
+    # returns the manifest: hashed name of every file, and the encodings
+    # each hashed file is available in
+    files, encodings = {}, {}
+    # CSS last, once the files it refers to have their hashed names
+    for name in sorted(source_files(static_folder, dist), key=lambda name: (name.endswith('.css'), name)):
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            content = f.read()
+        if name.endswith('.css'):
+            content = rewrite_css(name, content, files)
+        files[name] = hashed = hashed_name(name, content)
+        target = os.path.join(static_folder, dist, hashed)
+        write_file(target, content)
+        if name.endswith(COMPRESSIBLE):
+            variants = compress(content)
+            for encoding, suffix in ENCODINGS:
+                if encoding in variants:
+                    write_file(target + suffix, variants[encoding])
+            encodings[hashed] = [encoding for encoding, _ in ENCODINGS if encoding in variants]
+    manifest = {'files': files, 'encodings': encodings}
+    write_file(os.path.join(static_folder, dist, 'manifest.json'), json.dumps(manifest, indent=1).encode())
+    return manifest
+
+
+class Assets(object):
+
+    def __init__(self, app=None):
+        self.files = {}
+        self.encodings = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_DIST', 'dist')
+        app.config.setdefault('ASSETS_MAX_AGE', 365 * 24 * 3600)
+        self.load(app)
+        app.url_defaults(self.hashed_url)
+        app.view_functions['static'] = self.send_static
+
+    def load(self, app):
+        path = os.path.join(app.static_folder, app.config['ASSETS_DIST'], 'manifest.json')
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {'files': {}, 'encodings': {}}
+        self.files = manifest['files']
+        # hashed name -> encodings, with a key for every hashed file
+        self.encodings = {hashed: manifest['encodings'].get(hashed, []) for hashed in self.files.values()}
+
+    def hashed_url(self, endpoint, values):
+        # url_for('static', filename='css/main.css') -> /static/dist/css/main.<hash>.css
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = current_app.config['ASSETS_DIST'] + '/' + self.files[values['filename']]
+
+    def send_static(self, filename):
+        prefix = current_app.config['ASSETS_DIST'] + '/'
+        hashed = filename[len(prefix):] if filename.startswith(prefix) else None
+        if hashed not in self.encodings:
+            return current_app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if encoding in self.encodings[hashed] and request.accept_encodings[encoding]:
+                response = send_from_directory(current_app.static_folder, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(current_app.static_folder, filename, mimetype=mimetype)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = f'public, max-age={current_app.config["ASSETS_MAX_AGE"]}, immutable'
+        return response
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress the static files."""
+    dist = current_app.config['ASSETS_DIST']
+    manifest = build_assets(current_app.static_folder, dist)
+    compressed = sum(1 for encodings in manifest['encodings'].values() if encodings)
+    click.echo(f'{len(manifest["files"])} files written to static/{dist}, {compressed} of them compressed')
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        click.echo('brotli is not installed: only .gz versions were written')
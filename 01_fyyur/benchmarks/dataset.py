@@ -0,0 +1,164 @@
+#----------------------------------------------------------------------------#
+# Seeded synthetic venues, artists and shows.
+#
+#   python -m benchmarks.dataset [--venues 5000] [--artists 20000]
+#                                [--shows 2000000] [--seed 42]
+#
+# The same seed always produces the same rows. Cities and genres are drawn
+# from the choices in forms.py with a Zipf-like skew (a few big cities and
+# popular genres, a long tail of small ones), and popular venues and artists
+# get more shows, so the data exercises the listings the way real data
+# would. Every venue's shows sit in distinct 3-hour slots, which keeps the
+# Show_no_overlap constraint satisfied. The rows are inserted into the
+# configured database, so point it at a scratch database.
+#----------------------------------------------------------------------------#
+
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import create_app
+from extensions import db
+from bulk_import import chunks, insert_batch
+from forms import genre_choices, state_choices
+from models import Venue, Artist, Show, refresh_show_counters
+
+GENRES = [value for value, _ in genre_choices]
+STATES = [value for value, _ in state_choices]
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Nashville', 'TN'),
+    ('Austin', 'TX'), ('San Francisco', 'CA'), ('New Orleans', 'LA'), ('Seattle', 'WA'),
+    ('Boston', 'MA'), ('Denver', 'CO'), ('Atlanta', 'GA'), ('Portland', 'OR'),
+    ('Philadelphia', 'PA'), ('Detroit', 'MI'), ('Minneapolis', 'MN'), ('Memphis', 'TN'),
+]
+EPOCH = datetime(2026, 1, 1)
+DAYS = 3 * 365
+SLOT_HOURS = 3
+SLOTS = DAYS * 24 // SLOT_HOURS
+
+
+def zipf_weights(n, s=1.1):
+    return list(itertools.accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+
+def _place(rng, i, city_weights):
+    # mostly the skewed big cities, and a small town in a random state for
+    # one row in ten
+    if rng.random() < 0.1:
+        return f'Town {i % 997}', rng.choice(STATES)
+    return rng.choices(CITIES, cum_weights=city_weights)[0]
+
+
+def _genres(rng, genre_weights):
+    return sorted(set(rng.choices(GENRES, cum_weights=genre_weights, k=rng.randint(1, 3))))
+
+
+def venue_rows(rng, n):
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES))
+    for i in range(n):
+        city, state = _place(rng, i, city_weights)
+        yield {
+            'name': f'Venue {i}',
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} Main St',
+            'phone': f'{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04}',
+            'image_link': f'https://example.com/venues/{i}.jpg',
+            'facebook_link': f'https://www.facebook.com/venue{i}',
+            'genres': _genres(rng, genre_weights),
+            'website': f'https://venue{i}.example.com',
+            'seeking_talent': rng.random() < 0.3,
+            'seeking_description': None,
+        }
+
+
+def artist_rows(rng, n):
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES))
+    for i in range(n):
+        city, state = _place(rng, i, city_weights)
+        yield {
+            'name': f'Artist {i}',
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-555-{rng.randint(0, 9999):04}',
+            'image_link': f'https://example.com/artists/{i}.jpg',
+            'facebook_link': f'https://www.facebook.com/artist{i}',
+            'genres': _genres(rng, genre_weights),
+            'website': None,
+            'seeking_venue': rng.random() < 0.3,
+            'seeking_description': None,
+        }
+
+
+def show_rows(rng, venue_ids, artist_ids, n):
+    # the k-th show of a venue takes slot (k * 7919 + offset) % SLOTS; 7919
+    # is coprime with SLOTS, so a venue never gets the same slot twice until
+    # it is full, and a full venue hands its show to the next one
+    venue_weights = zipf_weights(len(venue_ids), s=0.8)
+    artist_weights = zipf_weights(len(artist_ids), s=0.8)
+    booked = [0] * len(venue_ids)
+    for _ in range(n):
+        v = rng.choices(range(len(venue_ids)), cum_weights=venue_weights)[0]
+        while booked[v] >= SLOTS:
+            v = (v + 1) % len(venue_ids)
+        slot = (booked[v] * 7919 + v * 131) % SLOTS
+        booked[v] += 1
+        start_time = EPOCH + timedelta(hours=SLOT_HOURS * slot, minutes=rng.choice((0, 30, 60)))
+        yield {
+            'venue_id': venue_ids[v],
+            'artist_id': rng.choices(artist_ids, cum_weights=artist_weights)[0],
+            'start_time': start_time,
+            'end_time': start_time + timedelta(minutes=rng.choice((60, 90, 120))),
+        }
+
+
+def load(seed, n_venues, n_artists, n_shows, batch_size=10000):
+    # inserts the dataset of the given seed and sizes; needs an app context
+    rng = random.Random(seed)
+    for table, rows in ((Venue.__table__, venue_rows(rng, n_venues)),
+                        (Artist.__table__, artist_rows(rng, n_artists))):
+        for batch in chunks(rows, batch_size):
+            insert_batch(table, batch)
+        db.session.commit()
+
+    # the ids of this dataset: the newest rows, in insertion order
+    venue_ids = [v for v, in db.session.query(Venue.id).order_by(Venue.id.desc()).limit(n_venues)][::-1]
+    artist_ids = [a for a, in db.session.query(Artist.id).order_by(Artist.id.desc()).limit(n_artists)][::-1]
+    loaded = 0
+    for batch in chunks(show_rows(rng, venue_ids, artist_ids, n_shows), batch_size):
+        insert_batch(Show.__table__, batch)
+        db.session.commit()
+        loaded += len(batch)
+        print(f'  {loaded} shows loaded', end='\r')
+    print()
+
+    refresh_show_counters(venue_ids=venue_ids, artist_ids=artist_ids)
+    db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute('ANALYZE')
+    return venue_ids, artist_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load a seeded synthetic Fyyur dataset.')
+    parser.add_argument('--venues', type=int, default=5000)
+    parser.add_argument('--artists', type=int, default=20000)
+    parser.add_argument('--shows', type=int, default=2000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        load(args.seed, args.venues, args.artists, args.shows, args.batch_size)
+        print(f'loaded {args.venues} venues, {args.artists} artists and {args.shows} shows '
+              f'in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#----------------------------------------------------------------------------#
+# Render time of a 10k-row shows page with the previous `datetime` filter
+# (dateutil parse + babel pattern/locale resolution on every call) and with
+# the memoized one in app.py.
+#
+#   python -m benchmarks.datetime_filter [--rows 10000] [--repeat 5]
+#
+# No database is needed: the rows are synthetic and the template is
+# rendered inside a test request context.
+#----------------------------------------------------------------------------#
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+from flask import render_template
+
+from app import create_app, format_datetime
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(str(value))
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    elif format == 'short':
+        format = "MM/dd/y, HH:mm"
+    return babel.dates.format_datetime(date, format)
+
+
+def synthetic_shows(rows):
+    start = datetime(2026, 1, 1, 20, 0)
+    return [{
+        "venue_id": i % 500,
+        "venue_name": f"Venue {i % 500}",
+        "artist_id": i % 2000,
+        "artist_name": f"Artist {i % 2000}",
+        "artist_image_link": f"https://example.com/artists/{i % 2000}.jpg",
+        "start_time": start + timedelta(hours=i)
+    } for i in range(rows)]
+
+
+def best_render_time(shows, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render_template('pages/shows.html', shows=shows, next_url=None)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the datetime Jinja filter on the shows page.')
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    shows = synthetic_shows(args.rows)
+    with app.test_request_context('/shows'):
+        results = []
+        for name, f in (('legacy', legacy_format_datetime), ('memoized', format_datetime)):
+            app.jinja_env.filters['datetime'] = f
+            results.append((name, best_render_time(shows, args.repeat)))
+        app.jinja_env.filters['datetime'] = format_datetime
+
+    for name, seconds in results:
+        print(f'{name:>10}: {seconds * 1000:8.1f} ms per page, '
+              f'{seconds * 1e6 / args.rows:6.1f} us per row')
+    print(f'   speedup: {results[0][1] / results[1][1]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#----------------------------------------------------------------------------#
+# Startup cost of the app: importing app.py, building an app with
+# create_app(), and importing wsgi.py the way gunicorn --preload does in the
+# master (factory plus preload()).
+#
+#   python -m benchmarks.import_time [--runs 10] [--top 15]
+#
+# Every measurement runs in a fresh interpreter, so nothing is cached
+# between runs. --top lists the slowest top-level imports of app.py, from
+# python -X importtime. No database is needed.
+#----------------------------------------------------------------------------#
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STAGES = [
+    ('import app', 'import app'),
+    ('create_app()', 'import app; app.create_app()'),
+    ('import wsgi', 'import wsgi'),
+]
+
+
+def timed(code):
+    script = f'import time; started = time.perf_counter(); {code}; print(time.perf_counter() - started)'
+    output = subprocess.run([sys.executable, '-c', script], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    return float(output.decode().split()[-1])
+
+
+def slowest_imports(n):
+    # (cumulative microseconds, module) of the modules app.py imports directly
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=ROOT, check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).stderr.decode()
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit() and name.startswith('   ') and not name.startswith('    '):
+            imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the startup cost of the Fyyur app.')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=0, help='Also list the N slowest imports of app.py.')
+    args = parser.parse_args()
+
+    for name, code in STAGES:
+        times = [timed(code) for _ in range(args.runs)]
+        print(f'{name:>14}: median {statistics.median(times) * 1000:7.1f} ms   '
+              f'min {min(times) * 1000:7.1f} ms')
+    if args.top:
+        print('slowest imports of app.py:')
+        for cumulative, name in slowest_imports(args.top):
+            print(f'  {cumulative / 1000:7.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+#----------------------------------------------------------------------------#
+# Latency, SQL query count and rows fetched for every route of app.py.
+#
+#   python -m benchmarks.routes [--requests 50] [--output results.json]
+#   python -m benchmarks.routes --skip-load --compare results.json
+#
+# Loads a seeded dataset from benchmarks.dataset into the configured
+# database (point it at a scratch database: the write routes create, edit
+# and delete rows), then drives each route through the Flask test client
+# with the view cache disabled. Queries are counted with SQLAlchemy engine
+# events; rows fetched come from the DB-API cursor's rowcount, which
+# psycopg2 reports for SELECTs and SQLite does not (null in the results).
+# The JSON results can be kept and passed to --compare on a later run.
+#----------------------------------------------------------------------------#
+
+import argparse
+import io
+import json
+import random
+import statistics
+import time
+from collections import Counter, namedtuple
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db, view_cache
+from benchmarks.dataset import CITIES, EPOCH, GENRES, load
+from models import Venue, Artist, Show
+
+# make(sample, i) returns the url and form data of the i-th request
+Scenario = namedtuple('Scenario', ['name', 'endpoint', 'method', 'make'])
+
+
+class Sample(object):
+    # the ids and values the scenarios pick from, drawn once per run
+
+    def __init__(self, rng, size=200):
+        self.rng = rng
+        venue_ids = [v for v, in db.session.query(Venue.id)]
+        artist_ids = [a for a, in db.session.query(Artist.id)]
+        self.venue_ids = rng.sample(venue_ids, min(size, len(venue_ids)))
+        self.artist_ids = rng.sample(artist_ids, min(size, len(artist_ids)))
+        # new shows go after every existing one, a day apart, so that they
+        # never collide with a booking
+        last = db.session.query(db.func.max(Show.end_time)).scalar() or EPOCH
+        self.first_free_day = datetime(last.year, last.month, last.day) + timedelta(days=1)
+        self.run = int(time.time())
+
+    def venue_id(self):
+        return self.rng.choice(self.venue_ids)
+
+    def artist_id(self):
+        return self.rng.choice(self.artist_ids)
+
+    def created_venue_id(self, i):
+        # a venue made by the create-venue scenario of this run
+        return db.session.query(Venue.id).filter_by(name=f'Benchmark venue {self.run}-{i}').scalar()
+
+
+def venue_form(sample, name):
+    city, state = sample.rng.choice(CITIES)
+    return {
+        'name': name, 'city': city, 'state': state, 'address': '1 Main St',
+        'phone': '415-555-0100', 'image_link': '', 'facebook_link': '',
+        'genres': sample.rng.sample(GENRES, 2), 'website': '',
+        'seeking_talent': 'True', 'seeking_description': '',
+    }
+
+
+def artist_form(sample, name):
+    city, state = sample.rng.choice(CITIES)
+    return {
+        'name': name, 'city': city, 'state': state,
+        'phone': '415-555-0100', 'image_link': '', 'facebook_link': '',
+        'genres': sample.rng.sample(GENRES, 2), 'website': '',
+        'seeking_venue': 'True', 'seeking_description': '',
+    }
+
+
+def tour_lines(sample, i, size=10):
+    # a tour of the i-th request, on days after those of the create-show scenario
+    first_day = sample.first_free_day + timedelta(days=1000 + i * size)
+    return '\n'.join(f'{sample.venue_id()}, {first_day + timedelta(days=k, hours=20)}' for k in range(size))
+
+
+def shows_window(sample):
+    city, state = sample.rng.choice(CITIES)
+    start = EPOCH + timedelta(days=sample.rng.randrange(365))
+    return urlencode({'from': start.date().isoformat(), 'to': (start + timedelta(days=3)).date().isoformat(),
+                      'city': city, 'state': state})
+
+
+SCENARIOS = [
+    Scenario('home', 'main.index', 'GET', lambda s, i: ('/', None)),
+    Scenario('venues', 'main.venues', 'GET', lambda s, i: ('/venues', None)),
+    Scenario('venues by genre', 'main.venues', 'GET',
+             lambda s, i: ('/venues?' + urlencode({'genre': s.rng.choice(GENRES)}), None)),
+    Scenario('venue search', 'main.search_venues', 'GET',
+             lambda s, i: ('/venues/search?' + urlencode({'search_term': f'Venue {s.rng.randrange(100)}'}), None)),
+    Scenario('venue page', 'main.show_venue', 'GET', lambda s, i: (f'/venues/{s.venue_id()}', None)),
+    Scenario('venue form', 'main.create_venue_form', 'GET', lambda s, i: ('/venues/create', None)),
+    Scenario('create venue', 'main.create_venue_submission', 'POST',
+             lambda s, i: ('/venues/create', venue_form(s, f'Benchmark venue {s.run}-{i}'))),
+    Scenario('venue edit form', 'main.edit_venue', 'GET', lambda s, i: (f'/venues/{s.venue_id()}/edit', None)),
+    Scenario('edit venue', 'main.edit_venue_submission', 'POST',
+             lambda s, i: (f'/venues/{s.venue_id()}/edit', venue_form(s, f'Edited venue {i}'))),
+    Scenario('delete venue', 'main.delete_venue', 'DELETE', lambda s, i: (f'/venues/{s.created_venue_id(i)}', None)),
+    Scenario('artists', 'main.artists', 'GET', lambda s, i: ('/artists', None)),
+    Scenario('artists by genre', 'main.artists', 'GET',
+             lambda s, i: ('/artists?' + urlencode({'genre': s.rng.choice(GENRES)}), None)),
+    Scenario('artist search', 'main.search_artists', 'GET',
+             lambda s, i: ('/artists/search?' + urlencode({'search_term': f'Artist {s.rng.randrange(100)}'}), None)),
+    Scenario('artist page', 'main.show_artist', 'GET', lambda s, i: (f'/artists/{s.artist_id()}', None)),
+    Scenario('artist form', 'main.create_artist_form', 'GET', lambda s, i: ('/artists/create', None)),
+    Scenario('create artist', 'main.create_artist_submission', 'POST',
+             lambda s, i: ('/artists/create', artist_form(s, f'Benchmark artist {s.run}-{i}'))),
+    Scenario('artist edit form', 'main.edit_artist', 'GET', lambda s, i: (f'/artists/{s.artist_id()}/edit', None)),
+    Scenario('edit artist', 'main.edit_artist_submission', 'POST',
+             lambda s, i: (f'/artists/{s.artist_id()}/edit', artist_form(s, f'Edited artist {i}'))),
+    Scenario('shows', 'main.shows', 'GET', lambda s, i: ('/shows', None)),
+    Scenario('shows json', 'main.shows', 'GET', lambda s, i: ('/shows?format=json', None)),
+    Scenario('shows weekend/city', 'main.shows', 'GET', lambda s, i: ('/shows?format=json&' + shows_window(s), None)),
+    Scenario('show form', 'main.create_shows', 'GET', lambda s, i: ('/shows/create', None)),
+    Scenario('create show', 'main.create_show_submission', 'POST',
+             lambda s, i: ('/shows/create', {'venue_id': s.venue_id(), 'artist_id': s.artist_id(),
+                                             'start_time': str(s.first_free_day + timedelta(days=i, hours=20))})),
+    Scenario('tour form', 'main.create_tour_form', 'GET', lambda s, i: ('/shows/tour', None)),
+    Scenario('create tour', 'main.create_tour_submission', 'POST',
+             lambda s, i: ('/shows/tour', {'artist_id': s.artist_id(), 'shows': tour_lines(s, i)})),
+    Scenario('cache stats', 'main.cache_stats', 'GET', lambda s, i: ('/cache/stats', None)),
+]
+
+
+#  Measuring
+#  ----------------------------------------------------------------
+
+@contextmanager
+def counting_queries(engine):
+    counts = {'queries': 0, 'rows': 0, 'rows_known': True}
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counts['queries'] += 1
+        if cursor.description is not None:
+            if cursor.rowcount >= 0:
+                counts['rows'] += cursor.rowcount
+            else:
+                counts['rows_known'] = False
+
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    try:
+        yield counts
+    finally:
+        event.remove(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def percentile(values, q):
+    return sorted(values)[min(int(len(values) * q), len(values) - 1)]
+
+
+def run_scenario(client, sample, scenario, n_requests, warmup):
+    latencies, queries, rows, statuses = [], [], [], Counter()
+    for i in range(warmup + n_requests):
+        url, data = scenario.make(sample, i)
+        with counting_queries(db.engine) as counts, redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            response = client.open(url, method=scenario.method, data=data)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counts['queries'])
+        rows.append(counts['rows'] if counts['rows_known'] else None)
+        statuses[response.status_code] += 1
+    return {
+        'name': scenario.name,
+        'endpoint': scenario.endpoint,
+        'method': scenario.method,
+        'requests': n_requests,
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 3),
+        'queries': round(statistics.mean(queries), 2),
+        'rows': None if None in rows else round(statistics.mean(rows), 2),
+    }
+
+
+def unbenchmarked_endpoints(app):
+    covered = {scenario.endpoint for scenario in SCENARIOS}
+    return sorted({rule.endpoint for rule in app.url_map.iter_rules()} - covered - {'static'})
+
+
+#  Reporting
+#  ----------------------------------------------------------------
+
+def print_results(results, baseline=None):
+    before = {r['name']: r for r in baseline['routes']} if baseline else {}
+    print(f'{"route":<22} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8} {"rows":>9}  status')
+    for r in results['routes']:
+        rows = '-' if r['rows'] is None else f'{r["rows"]:.0f}'
+        line = (f'{r["name"]:<22} {r["p50_ms"]:9.2f} {r["p95_ms"]:9.2f} {r["queries"]:8.1f} {rows:>9}  '
+                + ' '.join(f'{code}x{count}' for code, count in r['status'].items()))
+        old = before.get(r['name'])
+        if old:
+            line += f'   p50 {(r["p50_ms"] / old["p50_ms"] - 1) * 100:+.0f}%' if old['p50_ms'] else ''
+            if r['queries'] != old['queries']:
+                line += f', queries {old["queries"]:.1f} -> {r["queries"]:.1f}'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every Fyyur route.')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--requests', type=int, default=50, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per route.')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', help='Results of an earlier run to compare with.')
+    args = parser.parse_args()
+
+    app = create_app()
+    view_cache.enabled = False
+    client = app.test_client()
+    with app.app_context():
+        if not args.skip_load:
+            load(args.seed, args.venues, args.artists, args.shows)
+        sample = Sample(random.Random(args.seed))
+        routes = [run_scenario(client, sample, scenario, args.requests, args.warmup)
+                  for scenario in SCENARIOS]
+        results = {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'database': db.engine.dialect.name,
+            'seed': args.seed,
+            'dataset': {
+                'venues': db.session.query(db.func.count(Venue.id)).scalar(),
+                'artists': db.session.query(db.func.count(Artist.id)).scalar(),
+                'shows': db.session.query(db.func.count(Show.id)).scalar(),
+            },
+            'routes': routes,
+        }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    missing = unbenchmarked_endpoints(app)
+    if missing:
+        print('not benchmarked: ' + ', '.join(missing))
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#----------------------------------------------------------------------------#
+# Latency of bounded time-window queries on /shows over a large synthetic
+# Show table.
+#
+#   python -m benchmarks.show_calendar [--shows 2000000] [--queries 200]
+#   python -m benchmarks.show_calendar --skip-load     # reuse loaded data
+#
+# The synthetic venues, artists and shows come from benchmarks.dataset and
+# are inserted into the configured database, so point it at a scratch
+# database. Each query asks for a random weekend in a random city, through
+# the JSON variant of /shows with the view cache disabled.
+#----------------------------------------------------------------------------#
+
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from app import create_app
+from extensions import db, view_cache
+from benchmarks.dataset import CITIES, DAYS, EPOCH, load
+from models import Show
+
+
+def run_queries(client, rng, n_queries):
+    latencies, sizes = [], []
+    for _ in range(n_queries):
+        city, state = rng.choice(CITIES)
+        start = EPOCH + timedelta(days=rng.randrange(DAYS - 3))
+        end = start + timedelta(days=3)
+        url = '/shows?' + urlencode({'format': 'json', 'from': start.date().isoformat(),
+                                     'to': end.date().isoformat(), 'city': city, 'state': state})
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+        sizes.append(len(response.get_json()['shows']))
+    return latencies, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark time-window queries on /shows.')
+    parser.add_argument('--shows', type=int, default=2000000)
+    parser.add_argument('--venues', type=int, default=5000)
+    parser.add_argument('--artists', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-load', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app()
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if not args.skip_load:
+            started = time.perf_counter()
+            load(args.seed, args.venues, args.artists, args.shows)
+            print(f'loaded {args.shows} shows in {time.perf_counter() - started:.1f}s')
+        total = db.session.query(db.func.count(Show.id)).scalar()
+
+    view_cache.enabled = False
+    latencies, sizes = run_queries(app.test_client(), rng, args.queries)
+    latencies.sort()
+    print(f'{total} shows, {args.queries} weekend/city queries, '
+          f'{statistics.mean(sizes):.1f} rows per page on average')
+    print(f'  p50 {latencies[len(latencies) // 2] * 1000:.1f} ms   '
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms   '
+          f'max {latencies[-1] * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
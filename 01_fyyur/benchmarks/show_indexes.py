@@ -0,0 +1,97 @@
+#----------------------------------------------------------------------------#
+# Query plans for the Show access paths, without and with the indexes added
+# in migration 8b5e0d41c6a2.
+#
+#   python -m benchmarks.show_indexes [--analyze] [--venue-id N] [--artist-id N]
+#
+# The "before" plans are taken after dropping the indexes inside a
+# transaction that is rolled back afterwards, so the schema is left as it
+# was. DROP INDEX takes an exclusive lock on Show for the duration: run this
+# against a copy of the data, not against the live database.
+#----------------------------------------------------------------------------#
+
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+
+from app import create_app
+from extensions import db
+from models import Show
+
+INDEXES = ['ix_Show_venue_id_start_time', 'ix_Show_artist_id_start_time', 'ix_Show_start_time_id']
+
+
+def access_paths(venue_id, artist_id, now):
+    return [
+        ('venue detail', db.session.query(Show.id, Show.start_time).
+            filter(Show.venue_id == venue_id).order_by(Show.start_time)),
+        ('artist detail', db.session.query(Show.id, Show.start_time).
+            filter(Show.artist_id == artist_id).order_by(Show.start_time)),
+        ('venue upcoming count', db.session.query(db.func.count(Show.id)).
+            filter(Show.venue_id == venue_id, Show.start_time > now)),
+        ('shows page', db.session.query(Show.id, Show.start_time).
+            filter(db.tuple_(Show.start_time, Show.id) > db.tuple_(now, 0)).
+            order_by(Show.start_time, Show.id).limit(50)),
+    ]
+
+
+def explain(connection, query, analyze):
+    dialect = connection.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    if dialect.name == 'postgresql':
+        prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze else 'EXPLAIN '
+    else:
+        prefix = 'EXPLAIN QUERY PLAN '
+    if compiled.positional:
+        params = tuple(compiled.params[k] for k in compiled.positiontup)
+    else:
+        params = compiled.params
+    rows = connection.execute(prefix + str(compiled), params).fetchall()
+    return '\n'.join('    ' + ' | '.join(str(c) for c in row) for row in rows)
+
+
+@contextmanager
+def rolled_back(connection):
+    transaction = connection.begin()
+    if connection.dialect.name == 'sqlite':
+        # pysqlite does not open a transaction before DDL on its own
+        connection.connection.isolation_level = None
+        connection.execute('BEGIN')
+    try:
+        yield
+    finally:
+        transaction.rollback()
+
+
+def print_plans(connection, title, paths, analyze):
+    print('=' * 72)
+    print(title)
+    print('=' * 72)
+    for name, query in paths:
+        print(f'-- {name}')
+        print(explain(connection, query, analyze))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show query plans without and with the Show indexes.')
+    parser.add_argument('--venue-id', type=int, default=1)
+    parser.add_argument('--artist-id', type=int, default=1)
+    parser.add_argument('--analyze', action='store_true',
+                        help='run EXPLAIN ANALYZE on Postgres')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        paths = access_paths(args.venue_id, args.artist_id, datetime.now())
+        connection = db.engine.connect()
+        with rolled_back(connection):
+            for name in INDEXES:
+                connection.execute(f'DROP INDEX IF EXISTS "{name}"')
+            print_plans(connection, 'before: primary and foreign keys only', paths, args.analyze)
+
+        print_plans(connection, 'after: composite Show indexes', paths, args.analyze)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
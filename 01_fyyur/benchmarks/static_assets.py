@@ -0,0 +1,69 @@
+#----------------------------------------------------------------------------#
+# Bytes transferred for a cold load of a page: the HTML plus every static
+# file it references, with and without the `flask build-assets` output.
+#
+#   python -m benchmarks.static_assets [--page /] [--page /shows/create]
+#   python -m benchmarks.static_assets --skip-build   # use the current build
+#
+# Runs the build first (into static/dist) unless --skip-build. Each page is
+# then fetched through the Flask test client like a browser with an empty
+# cache that accepts gzip and brotli: once with the manifest unloaded, so
+# Flask serves the original files, and once with it loaded. The home page
+# needs no database; other pages need the configured one.
+#----------------------------------------------------------------------------#
+
+import argparse
+import re
+
+from app import create_app
+from assets import build_assets
+from extensions import assets
+
+ASSET_URL = re.compile(r'''(?:href|src)=["'](/static/[^"']+)["']''')
+HEADERS = {'Accept-Encoding': 'gzip, deflate, br'}
+
+
+def cold_load(client, page):
+    # (bytes of the page, {asset url: (status, bytes, encoding, cache-control)})
+    response = client.get(page, headers=HEADERS)
+    html = response.get_data(as_text=True)
+    loaded = {}
+    for url in dict.fromkeys(ASSET_URL.findall(html)):
+        asset = client.get(url, headers=HEADERS)
+        loaded[url] = (asset.status_code, len(asset.get_data()),
+                       asset.headers.get('Content-Encoding', '-'), asset.headers.get('Cache-Control', '-'))
+        asset.close()
+    return len(html.encode()), loaded
+
+
+def report(name, page_bytes, loaded):
+    ok = [size for status, size, _, _ in loaded.values() if status == 200]
+    print(f'  {name:<6} {page_bytes + sum(ok):>9} bytes   {len(ok)} assets'
+          f' ({len(loaded) - len(ok)} missing)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the bytes of a cold page load.')
+    parser.add_argument('--page', action='append', help='Page to load (repeatable) [default: /].')
+    parser.add_argument('--skip-build', action='store_true')
+    parser.add_argument('--verbose', action='store_true', help='List every asset of the built run.')
+    args = parser.parse_args()
+
+    app = create_app()
+    if not args.skip_build:
+        build_assets(app.static_folder, app.config['ASSETS_DIST'])
+    client = app.test_client()
+    for page in args.page or ['/']:
+        print(page)
+        assets.files, assets.encodings = {}, {}
+        report('plain', *cold_load(client, page))
+        assets.load(app)
+        page_bytes, loaded = cold_load(client, page)
+        report('built', page_bytes, loaded)
+        if args.verbose:
+            for url, (status, size, encoding, cache_control) in loaded.items():
+                print(f'    {status} {size:>8} {encoding:<5} {url}  [{cache_control}]')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#----------------------------------------------------------------------------#
+# Creating a tour's shows one request at a time (/shows/create, once per
+# show) against one batch request (/shows/tour).
+#
+#   python -m benchmarks.tour_batch [--sizes 10,50,200] [--repeat 5]
+#   python -m benchmarks.tour_batch --skip-load
+#
+# Loads the seeded dataset of benchmarks.dataset into the configured
+# database unless --skip-load, so point it at a scratch database: both
+# paths really insert their shows. Every tour goes to free days after the
+# last existing show, so no show is rejected as a double booking.
+#----------------------------------------------------------------------------#
+
+import argparse
+import io
+import random
+import statistics
+import time
+from contextlib import redirect_stdout
+from datetime import timedelta
+
+from app import create_app
+from extensions import db, view_cache
+from benchmarks.dataset import load
+from benchmarks.routes import Sample, counting_queries
+
+
+def tour(sample, first_day, size):
+    artist_id = sample.artist_id()
+    return artist_id, [(sample.venue_id(), first_day + timedelta(days=k, hours=20)) for k in range(size)]
+
+
+def one_at_a_time(client, artist_id, stops):
+    for venue_id, start_time in stops:
+        response = client.post('/shows/create', data={'artist_id': artist_id, 'venue_id': venue_id,
+                                                      'start_time': str(start_time)})
+        assert response.status_code == 200, response.status_code
+
+
+def batch(client, artist_id, stops):
+    response = client.post('/shows/tour', json={
+        'artist_id': artist_id,
+        'shows': [{'venue_id': venue_id, 'start_time': start_time.isoformat()} for venue_id, start_time in stops],
+    })
+    assert response.status_code == 201, response.get_json()
+
+
+def measure(path, client, tours):
+    times, queries = [], []
+    for artist_id, stops in tours:
+        with counting_queries(db.engine) as counts, redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            path(client, artist_id, stops)
+            times.append(time.perf_counter() - started)
+        queries.append(counts['queries'])
+    return statistics.median(times), statistics.mean(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch tour creation against single shows.')
+    parser.add_argument('--venues', type=int, default=500)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--skip-load', action='store_true')
+    parser.add_argument('--sizes', default='10,50,200', help='Shows per tour, comma separated.')
+    parser.add_argument('--repeat', type=int, default=5, help='Tours per size and path.')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    view_cache.enabled = False
+    client = app.test_client()
+    with app.app_context():
+        if not args.skip_load:
+            load(args.seed, args.venues, args.artists, args.shows)
+        sample = Sample(random.Random(args.seed))
+        day = sample.first_free_day
+
+        print(f'{"shows":>6} {"path":<8} {"ms/tour":>10} {"shows/s":>9} {"queries":>8}')
+        for size in [int(size) for size in args.sizes.split(',')]:
+            for name, path in (('single', one_at_a_time), ('batch', batch)):
+                tours = []
+                for _ in range(args.repeat):
+                    tours.append(tour(sample, day, size))
+                    day += timedelta(days=size)
+                elapsed, queries = measure(path, client, tours)
+                print(f'{size:>6} {name:<8} {elapsed * 1000:10.1f} {size / elapsed:9.0f} {queries:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+#----------------------------------------------------------------------------#
+# Bulk import of venues, artists and shows.
+#
+#   flask import-data venues venues.csv
+#   flask import-data artists artists.ndjson --batch-size 5000
+#   flask import-data shows shows.csv
+#
+# Files are streamed (CSV with a header row, or one JSON object per line for
+# .ndjson/.jsonl) and validated against the choices in forms.py. Valid rows
+# are inserted in batches, one transaction per batch; invalid rows, lines
+# that are not a JSON object included, are reported with their line number
+# and skipped. Shows reference their venue
+# and artist either by id or by natural key: venue_name/venue_city/
+# venue_state and artist_name; end_time is optional. Shows whose venue or
+# artist does not exist, or that overlap a booking of their venue (already
+# in the database or earlier in the file), are rejected like invalid rows;
+# a batch that still hits the exclusion constraint, because of a booking
+# made meanwhile, is rejected as a whole and the import goes on.
+#----------------------------------------------------------------------------#
+
+import csv
+import json
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db, view_cache
+from forms import genre_choices, state_choices
+from models import Venue, Artist, Show, refresh_show_counters
+from scheduling import check_show_times, default_end_time, is_exclusion_violation, iter_conflicts
+
+GENRES = {value for value, _ in genre_choices}
+STATES = {value for value, _ in state_choices}
+
+
+class RowError(ValueError):
+    pass
+
+
+#  Reading
+#  ----------------------------------------------------------------
+
+def read_rows(path):
+    # yields (line number, row) without loading the file into memory: a dict
+    # for CSV, the text of the line for NDJSON, which parse_row() decodes
+    if path.endswith(('.ndjson', '.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, line
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+
+
+def parse_row(row):
+    # run with the other checks of the row, so that a bad line is rejected
+    # instead of ending the import
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise RowError(f'invalid JSON: {e}')
+    if not isinstance(row, dict):
+        raise RowError('not a JSON object')
+    return row
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+#  Validation
+#  ----------------------------------------------------------------
+
+def _text(row, field, required=False):
+    value = row.get(field)
+    # JSON numbers are fine (ids, phone numbers), objects and lists are not
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    elif value is not None and not isinstance(value, str):
+        raise RowError(f'invalid {field}: {json.dumps(value)}')
+    value = value.strip() if value is not None else None
+    if required and not value:
+        raise RowError(f'{field} is required')
+    return value or None
+
+
+def _bool(row, field):
+    value = row.get(field)
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def _genres(row):
+    value = row.get('genres') or []
+    if isinstance(value, str):
+        value = [g.strip() for g in value.split(',') if g.strip()]
+    elif not isinstance(value, list) or not all(isinstance(g, str) for g in value):
+        raise RowError('genres must be a list of names or a comma-separated string')
+    if not value:
+        raise RowError('genres is required')
+    unknown = set(value) - GENRES
+    if unknown:
+        raise RowError('unknown genres: ' + ', '.join(sorted(unknown)))
+    return value
+
+
+def _state(row):
+    state = _text(row, 'state', required=True)
+    if state not in STATES:
+        raise RowError(f'unknown state: {state}')
+    return state
+
+
+def _datetime(row, field, required=False):
+    value = _text(row, field, required=required)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise RowError(f'invalid {field}: {value}')
+
+
+def venue_values(row):
+    return {
+        'name': _text(row, 'name', required=True),
+        'city': _text(row, 'city', required=True),
+        'state': _state(row),
+        'address': _text(row, 'address', required=True),
+        'phone': _text(row, 'phone'),
+        'image_link': _text(row, 'image_link'),
+        'facebook_link': _text(row, 'facebook_link'),
+        'genres': _genres(row),
+        'website': _text(row, 'website'),
+        'seeking_talent': _bool(row, 'seeking_talent'),
+        'seeking_description': _text(row, 'seeking_description'),
+    }
+
+
+def artist_values(row):
+    return {
+        'name': _text(row, 'name', required=True),
+        'city': _text(row, 'city', required=True),
+        'state': _state(row),
+        'phone': _text(row, 'phone'),
+        'image_link': _text(row, 'image_link'),
+        'facebook_link': _text(row, 'facebook_link'),
+        'genres': _genres(row),
+        'website': _text(row, 'website'),
+        'seeking_venue': _bool(row, 'seeking_venue'),
+        'seeking_description': _text(row, 'seeking_description'),
+    }
+
+
+#  Foreign keys of shows
+#  ----------------------------------------------------------------
+
+def _venue_key(row):
+    return (_text(row, 'venue_name', required=True), _text(row, 'venue_city'), _text(row, 'venue_state'))
+
+
+def _key_names(rows, name_field, id_field):
+    # the names of the rows without an id; show_values() rejects the rows
+    # whose fields are invalid
+    names = set()
+    for _, row in rows:
+        try:
+            if not _text(row, id_field):
+                names.add(_text(row, name_field))
+        except RowError:
+            pass
+    return names - {None}
+
+
+def resolve_show_keys(rows):
+    # one query per table and batch for the rows that use natural keys
+    venue_names = _key_names(rows, 'venue_name', 'venue_id')
+    artist_names = _key_names(rows, 'artist_name', 'artist_id')
+    venues = {}
+    if venue_names:
+        for venue_id, name, city, state in db.session.query(Venue.id, Venue.name, Venue.city, Venue.state).\
+                filter(Venue.name.in_(venue_names)):
+            venues.setdefault((name, city, state), venue_id)
+            venues.setdefault((name, None, None), venue_id)
+    artists = {}
+    if artist_names:
+        for artist_id, name in db.session.query(Artist.id, Artist.name).filter(Artist.name.in_(artist_names)):
+            artists.setdefault(name, artist_id)
+    return venues, artists
+
+
+def show_values(row, venues, artists):
+    venue_id = _text(row, 'venue_id')
+    if venue_id is None:
+        venue_id = venues.get(_venue_key(row))
+        if venue_id is None:
+            raise RowError('unknown venue: ' + ', '.join(filter(None, _venue_key(row))))
+    artist_id = _text(row, 'artist_id')
+    if artist_id is None:
+        artist_id = artists.get(_text(row, 'artist_name', required=True))
+        if artist_id is None:
+            raise RowError('unknown artist: ' + _text(row, 'artist_name'))
+    start_time = _datetime(row, 'start_time', required=True)
+    end_time = _datetime(row, 'end_time') or default_end_time(start_time)
+    check_show_times(start_time, end_time)
+    return {
+        'venue_id': int(venue_id),
+        'artist_id': int(artist_id),
+        'start_time': start_time,
+        'end_time': end_time,
+    }
+
+
+def batch_conflicts(entries, booked):
+    # the {line number: reason} of the (line number, values) of a batch of
+    # shows that overlap one of the (venue_id, id, start_time, end_time)
+    # shows already booked, or an earlier row of the batch. Batch rows go
+    # through the sweep line of scheduling.py with negative ids
+    rows = list(booked) + [(values['venue_id'], -i, values['start_time'], values['end_time'])
+                           for i, (_, values) in enumerate(entries, 1)]
+    rows.sort(key=lambda row: (row[0], row[2], row[1]))
+    rejected = {}
+    # the pairs come in start order: of two batch rows the later one is
+    # rejected, unless the earlier one already was
+    for _, earlier, later in iter_conflicts(rows):
+        if later < 0 and earlier > 0:
+            rejected.setdefault(entries[-later - 1][0], f'the venue is already booked (show {earlier})')
+        elif later < 0 and entries[-earlier - 1][0] not in rejected:
+            rejected.setdefault(entries[-later - 1][0], f'overlaps the show on line {entries[-earlier - 1][0]}')
+        elif later > 0 and earlier < 0:
+            rejected.setdefault(entries[-earlier - 1][0], f'the venue is already booked (show {later})')
+    return rejected
+
+
+def check_show_batch(entries):
+    # splits the (line number, values) of a batch of shows into the accepted
+    # ones and the rejected (line number, reason): unknown venue or artist
+    # ids in one query, then overlaps with one range query over the batch's
+    # time span
+    known = set(db.session.query(db.literal('venue'), Venue.id).
+                filter(Venue.id.in_({values['venue_id'] for _, values in entries})).
+                union_all(db.session.query(db.literal('artist'), Artist.id).
+                          filter(Artist.id.in_({values['artist_id'] for _, values in entries}))))
+    accepted, rejected = [], {}
+    for line_no, values in entries:
+        if ('venue', values['venue_id']) not in known:
+            rejected[line_no] = f'unknown venue: {values["venue_id"]}'
+        elif ('artist', values['artist_id']) not in known:
+            rejected[line_no] = f'unknown artist: {values["artist_id"]}'
+        else:
+            accepted.append((line_no, values))
+    if accepted:
+        max_duration = timedelta(minutes=current_app.config['SHOW_MAX_DURATION_MINUTES'])
+        booked = db.session.query(Show.venue_id, Show.id, Show.start_time, Show.end_time).\
+            filter(Show.venue_id.in_({values['venue_id'] for _, values in accepted}),
+                   Show.start_time > min(values['start_time'] for _, values in accepted) - max_duration,
+                   Show.start_time < max(values['end_time'] for _, values in accepted)).\
+            all()
+        rejected.update(batch_conflicts(accepted, booked))
+        accepted = [(line_no, values) for line_no, values in accepted if line_no not in rejected]
+    return accepted, sorted(rejected.items())
+
+
+#  Loading
+#  ----------------------------------------------------------------
+
+def insert_batch(table, values):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # one multi-row INSERT per page instead of a round trip per row
+        from psycopg2.extras import execute_values
+        columns = list(values[0])
+        sql = 'INSERT INTO "{}" ({}) VALUES %s'.format(table.name, ', '.join(columns))
+        with connection.connection.cursor() as cursor:
+            execute_values(cursor, sql, [tuple(v[c] for c in columns) for v in values], page_size=len(values))
+    else:
+        connection.execute(table.insert(), values)
+
+
+def load(kind, path, batch_size, max_errors):
+    model = {'venues': Venue, 'artists': Artist, 'shows': Show}[kind]
+    loaded = rejected = 0
+    started = time.monotonic()
+
+    def reject(line_no, reason):
+        nonlocal rejected
+        rejected += 1
+        if rejected <= max_errors:
+            click.echo(f'{path}:{line_no}: {reason}', err=True)
+
+    for batch in chunks(read_rows(path), batch_size):
+        rows = []
+        for line_no, row in batch:
+            try:
+                rows.append((line_no, parse_row(row)))
+            except RowError as e:
+                reject(line_no, e)
+        if kind == 'shows':
+            venues, artists = resolve_show_keys(rows)
+        entries = []
+        for line_no, row in rows:
+            try:
+                if kind == 'venues':
+                    entries.append((line_no, venue_values(row)))
+                elif kind == 'artists':
+                    entries.append((line_no, artist_values(row)))
+                else:
+                    entries.append((line_no, show_values(row, venues, artists)))
+            except ValueError as e:
+                reject(line_no, e)
+        if kind == 'shows' and entries:
+            entries, invalid = check_show_batch(entries)
+            for line_no, reason in invalid:
+                reject(line_no, reason)
+
+        if entries:
+            values = [v for _, v in entries]
+            try:
+                insert_batch(model.__table__, values)
+                if kind == 'shows':
+                    refresh_show_counters(venue_ids={v['venue_id'] for v in values},
+                                          artist_ids={v['artist_id'] for v in values})
+                db.session.commit()
+                loaded += len(values)
+            except Exception as e:
+                db.session.rollback()
+                if not is_exclusion_violation(e):
+                    raise
+                # booked by someone else since check_show_batch()
+                for line_no, _ in entries:
+                    reject(line_no, 'overlaps a show booked during the import')
+
+        elapsed = time.monotonic() - started
+        click.echo(f'{loaded} rows loaded, {rejected} rejected, {loaded / elapsed if elapsed else 0:.0f} rows/s')
+
+    view_cache.bump({'venues': 'venue', 'artists': 'artist', 'shows': 'show'}[kind])
+    return loaded, rejected
+
+
+@click.command('import-data')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per transaction.')
+@click.option('--max-errors', default=20, show_default=True, help='Rejected rows to print.')
+@with_appcontext
+def import_command(kind, path, batch_size, max_errors):
+    """Bulk load venues, artists or shows from a CSV or NDJSON file."""
+    started = time.monotonic()
+    loaded, rejected = load(kind, path, batch_size, max_errors)
+    elapsed = time.monotonic() - started
+    click.echo(f'done: {loaded} {kind} in {elapsed:.1f}s '
+               f'({loaded / elapsed if elapsed else 0:.0f} rows/s), {rejected} rejected')
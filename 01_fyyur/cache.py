@@ -0,0 +1,226 @@
+#----------------------------------------------------------------------------#
+# Versioned view-data cache.
+#
+# Views memoize the data they hand to their template under a key that
+# includes the current version of every entity the data depends on. Write
+# handlers bump those versions, so stale entries are simply never looked up
+# again and age out of the LRU; the TTL bounds how long time-dependent data
+# (past/upcoming splits) can lag behind the clock.
+#
+# The versions have to be seen by every worker, whichever one handled the
+# write: 'redis' keeps them next to the entries, 'memory' keeps the entries
+# in each worker but the versions in CACHE_VERSIONS_FILE, a memory-mapped
+# file shared by the workers of the host. Workers spread over several hosts
+# need 'redis'.
+#
+# Entries filled from the read replica are kept apart from those filled
+# from the primary, so that a session pinned to the primary after a write
+# (replica.py) never gets data read from the lagging replica.
+#----------------------------------------------------------------------------#
+
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from functools import wraps
+
+from replica import reads_from_replica
+
+_missing = object()
+
+
+class VersionFile(object):
+    # version counters in a memory-mapped file: every process that maps it
+    # sees the others' bumps, with or without gunicorn --preload. Names hash
+    # into a fixed number of slots; two names sharing a slot only invalidate
+    # each other's entries more often than needed
+
+    def __init__(self, path, slots=65536):
+        import fcntl
+        self._fcntl = fcntl
+        self.slots = slots
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < slots * 8:
+            os.ftruncate(self._fd, slots * 8)
+        self._map = mmap.mmap(self._fd, slots * 8)
+        # the file lock keeps processes apart (it belongs to the process, not
+        # to the descriptor a forked worker inherits); the thread lock keeps
+        # the threads of one worker apart
+        self._lock = threading.Lock()
+
+    def _offset(self, name):
+        return zlib.crc32(name.encode('utf-8')) % self.slots * 8
+
+    def get(self, names):
+        return [struct.unpack_from('=Q', self._map, self._offset(name))[0] for name in names]
+
+    def bump(self, names):
+        offsets = sorted({self._offset(name) for name in names})
+        with self._lock:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX)
+            try:
+                for offset in offsets:
+                    version, = struct.unpack_from('=Q', self._map, offset)
+                    struct.pack_into('=Q', self._map, offset, version + 1)
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN)
+
+
+class MemoryBackend(object):
+    # in-process LRU with per-entry expiry. Versions are never evicted: they
+    # live in the shared version file when one is given, else in a dict of
+    # this process
+
+    def __init__(self, max_entries=1024, version_file=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._version_file = version_file
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _missing
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _missing
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, names):
+        if self._version_file is not None:
+            return self._version_file.get(names)
+        with self._lock:
+            return [self._versions.get(name, 0) for name in names]
+
+    def bump(self, names):
+        if self._version_file is not None:
+            self._version_file.bump(names)
+            return
+        with self._lock:
+            for name in names:
+                self._versions[name] = self._versions.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend(object):
+    # shared between workers; needs the optional redis package
+
+    def __init__(self, url, prefix='fyyur:'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._redis.get(self.prefix + 'data:' + key)
+        return _missing if value is None else pickle.loads(value)
+
+    def set(self, key, value, ttl):
+        self._redis.set(self.prefix + 'data:' + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def versions(self, names):
+        values = self._redis.mget([self.prefix + 'version:' + name for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, names):
+        pipe = self._redis.pipeline()
+        for name in names:
+            pipe.incr(self.prefix + 'version:' + name)
+        pipe.execute()
+
+    def clear(self):
+        keys = list(self._redis.scan_iter(self.prefix + 'data:*'))
+        if keys:
+            self._redis.delete(*keys)
+
+
+class ViewCache(object):
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.enabled = False
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        # the counters are shared by the threads of a worker
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_ENABLED', True)
+        app.config.setdefault('CACHE_TYPE', 'memory')
+        app.config.setdefault('CACHE_DEFAULT_TTL', 60)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('CACHE_VERSIONS_FILE', os.path.join(app.instance_path, 'cache_versions'))
+
+        self.enabled = app.config['CACHE_ENABLED']
+        self.ttl = app.config['CACHE_DEFAULT_TTL']
+        if app.config['CACHE_TYPE'] == 'redis':
+            self.backend = RedisBackend(app.config['CACHE_REDIS_URL'])
+        else:
+            version_file = app.config['CACHE_VERSIONS_FILE']
+            self.backend = MemoryBackend(app.config['CACHE_MAX_ENTRIES'],
+                                         VersionFile(version_file) if version_file else None)
+
+    def memoize(self, *dependencies):
+        # dependencies are entity version names; '{0}', '{1}', ... are filled
+        # in with the positional arguments of the call, e.g. 'venue:{0}'
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args):
+                if not self.enabled:
+                    return f(*args)
+                names = [name.format(*args) for name in dependencies]
+                versions = self.backend.versions(names)
+                key = '{}{!r}@{}{}'.format(f.__name__, args, ','.join(map(str, versions)),
+                                           ':replica' if reads_from_replica() else '')
+                value = self.backend.get(key)
+                if value is not _missing:
+                    with self._stats_lock:
+                        self.hits += 1
+                    return value
+                with self._stats_lock:
+                    self.misses += 1
+                value = f(*args)
+                self.backend.set(key, value, self.ttl)
+                return value
+            return wrapper
+        return decorator
+
+    def bump(self, *names):
+        if self.backend is not None:
+            self.backend.bump(names)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        # exact for this worker process; every worker counts on its own
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,16 @@
+#----------------------------------------------------------------------------#
+# Extensions.
+#
+# Created unbound and bound to an app in create_app(), so that models and
+# the maintenance modules can use them without importing app.py.
+#----------------------------------------------------------------------------#
+
+from assets import Assets
+from cache import ViewCache
+from query_stats import QueryStats
+from replica import RoutingSQLAlchemy
+
+db = RoutingSQLAlchemy()
+view_cache = ViewCache()
+query_stats = QueryStats()
+assets = Assets()
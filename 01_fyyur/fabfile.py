@@ -13,6 +13,14 @@ def test():
         abort("Aborted at user request.")
 
 
+def benchmark(compare=None):
+    # run against a scratch database: the write routes change its data
+    command = "python -m benchmarks.routes --output benchmark-results.json"
+    if compare:
+        command += " --compare {}".format(compare)
+    local(command)
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
@@ -1,7 +1,7 @@
 from datetime import datetime
 from flask_wtf import Form
-from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
-from wtforms.validators import DataRequired, AnyOf, URL
+from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField, TextAreaField, BooleanField
+from wtforms.validators import DataRequired, AnyOf, URL, Optional
 
 genre_choices = [
             ('Alternative', 'Alternative'),
@@ -91,6 +91,22 @@ class ShowForm(Form):
         validators=[DataRequired()],
         default= datetime.today()
     )
+    end_time = DateTimeField(
+        'end_time',
+        validators=[Optional()]
+    )
+
+class TourForm(Form):
+    artist_id = StringField(
+        'artist_id', validators=[DataRequired()]
+    )
+    # one show per line: venue_id, start time[, end time]
+    shows = TextAreaField(
+        'shows', validators=[DataRequired()]
+    )
+    skip_invalid = BooleanField(
+        'skip_invalid'
+    )
 
 class VenueForm(Form):
     name = StringField(
@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:' + os.environ.get('PORT', '8000'))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+
+def post_fork(server, worker):
+    # database connections must not be shared across processes: drop any
+    # the master opened so that each worker builds its own pool
+    from extensions import db
+    from wsgi import app
+    with app.app_context():
+        db.engine.dispose()
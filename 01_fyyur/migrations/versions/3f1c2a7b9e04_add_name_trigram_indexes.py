@@ -0,0 +1,31 @@
+"""add trigram indexes on venue and artist names
+
+Revision ID: 3f1c2a7b9e04
+Revises: d42724900d6d
+Create Date: 2026-10-18 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c2a7b9e04'
+down_revision = 'd42724900d6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm lets a GIN index answer ILIKE '%term%'; like the rest of the
+    # schema (ARRAY genres), this needs Postgres
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'],
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
@@ -0,0 +1,24 @@
+"""add (state, city) index on Venue
+
+Revision ID: 5d93b7e1f0ac
+Revises: c71a9f3e25d8
+Create Date: 2026-10-18 13:40:12.557301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d93b7e1f0ac'
+down_revision = 'c71a9f3e25d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Venue_state_city', 'Venue', ['state', 'city'])
+
+
+def downgrade():
+    op.drop_index('ix_Venue_state_city', table_name='Venue')
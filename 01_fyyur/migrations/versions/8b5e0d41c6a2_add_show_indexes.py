@@ -0,0 +1,30 @@
+"""add composite indexes on Show
+
+Revision ID: 8b5e0d41c6a2
+Revises: 3f1c2a7b9e04
+Create Date: 2026-10-18 10:03:54.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b5e0d41c6a2'
+down_revision = '3f1c2a7b9e04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_Show_venue_id_start_time', 'Show', ['venue_id', 'start_time'])
+    op.create_index('ix_Show_artist_id_start_time', 'Show', ['artist_id', 'start_time'])
+    # b-tree rather than BRIN: /shows reads in (start_time, id) order with
+    # a LIMIT, which a BRIN index cannot return sorted
+    op.create_index('ix_Show_start_time_id', 'Show', ['start_time', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_Show_start_time_id', table_name='Show')
+    op.drop_index('ix_Show_artist_id_start_time', table_name='Show')
+    op.drop_index('ix_Show_venue_id_start_time', table_name='Show')
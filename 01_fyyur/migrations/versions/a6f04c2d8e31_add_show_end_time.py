@@ -0,0 +1,38 @@
+"""add Show.end_time and reject overlapping shows at a venue
+
+Revision ID: a6f04c2d8e31
+Revises: e2a8c45b7d19
+Create Date: 2026-10-18 16:08:21.664512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6f04c2d8e31'
+down_revision = 'e2a8c45b7d19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing shows get the default length of three hours
+    op.add_column('Show', sa.Column('end_time', sa.DateTime(), nullable=True))
+    op.execute('''UPDATE "Show" SET end_time = start_time + interval '180 minutes' ''')
+    op.alter_column('Show', 'end_time', existing_type=sa.DateTime(), nullable=False)
+    op.create_check_constraint('Show_end_after_start', 'Show', 'end_time > start_time')
+
+    # fails if the table already holds double bookings: list them with
+    # `flask show-conflicts`, fix them and run the upgrade again
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.execute('''
+        ALTER TABLE "Show" ADD CONSTRAINT "Show_no_overlap"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+
+
+def downgrade():
+    op.drop_constraint('Show_no_overlap', 'Show')
+    op.drop_constraint('Show_end_after_start', 'Show')
+    op.drop_column('Show', 'end_time')
@@ -0,0 +1,122 @@
+"""partition Show by month of start_time
+
+Revision ID: b3e9d0c1f7a4
+Revises: a6f04c2d8e31
+Create Date: 2026-10-18 18:02:47.318920
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e9d0c1f7a4'
+down_revision = 'a6f04c2d8e31'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_Show_venue_id_start_time', ['venue_id', 'start_time']),
+    ('ix_Show_artist_id_start_time', ['artist_id', 'start_time']),
+    ('ix_Show_start_time_id', ['start_time', 'id']),
+]
+# months created ahead of today; `flask show-partitions` keeps extending it
+MONTHS_AHEAD = 12
+
+
+def _add_months(month, n):
+    years, month_index = divmod(month.month - 1 + n, 12)
+    return datetime(month.year + years, month_index + 1, 1)
+
+
+def _no_overlap(table):
+    op.execute(f'''
+        ALTER TABLE "{table}" ADD CONSTRAINT "{table}_no_overlap"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+
+
+def upgrade():
+    # the old table keeps its rows until they are copied; its index-backed
+    # constraints are renamed or dropped to free their names
+    op.execute('ALTER TABLE "Show" DROP CONSTRAINT "Show_no_overlap"')
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='Show')
+    op.execute('ALTER TABLE "Show" RENAME TO "Show_unpartitioned"')
+    op.execute('ALTER INDEX "Show_pkey" RENAME TO "Show_unpartitioned_pkey"')
+
+    # the partition key has to be part of the primary key
+    op.execute('''
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'),
+            venue_id integer NOT NULL REFERENCES "Venue" (id),
+            artist_id integer NOT NULL REFERENCES "Artist" (id),
+            start_time timestamp without time zone NOT NULL,
+            end_time timestamp without time zone NOT NULL,
+            CONSTRAINT "Show_pkey" PRIMARY KEY (id, start_time),
+            CONSTRAINT "Show_end_after_start" CHECK (end_time > start_time)
+        ) PARTITION BY RANGE (start_time)
+    ''')
+    op.execute('CREATE TABLE "Show_default" PARTITION OF "Show" DEFAULT')
+
+    first, last = op.get_bind().execute('SELECT min(start_time), max(start_time) FROM "Show_unpartitioned"').first()
+    now = datetime.now()
+    month = datetime((first or now).year, (first or now).month, 1)
+    end = _add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD + 1)
+    if last is not None:
+        end = max(end, _add_months(datetime(last.year, last.month, 1), 1))
+    tables = ['Show_default']
+    while month < end:
+        name = f'Show_{month:%Y_%m}'
+        op.execute(f'''
+            CREATE TABLE "{name}" PARTITION OF "Show"
+            FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')
+        ''')
+        tables.append(name)
+        month = _add_months(month, 1)
+
+    op.execute('''
+        INSERT INTO "Show" (id, venue_id, artist_id, start_time, end_time)
+        SELECT id, venue_id, artist_id, start_time, end_time FROM "Show_unpartitioned"
+    ''')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.execute('DROP TABLE "Show_unpartitioned"')
+
+    # built after the copy; indexes on the parent cascade to the partitions,
+    # the exclusion constraint has to be added partition by partition
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns)
+    for table in tables:
+        _no_overlap(table)
+
+
+def downgrade():
+    op.execute('ALTER TABLE "Show" RENAME TO "Show_partitioned"')
+    op.execute('ALTER INDEX "Show_pkey" RENAME TO "Show_partitioned_pkey"')
+    for name, _ in INDEXES:
+        op.drop_index(name, table_name='Show_partitioned')
+    op.execute('''
+        CREATE TABLE "Show" (
+            id integer NOT NULL DEFAULT nextval('"Show_id_seq"'),
+            venue_id integer NOT NULL REFERENCES "Venue" (id),
+            artist_id integer NOT NULL REFERENCES "Artist" (id),
+            start_time timestamp without time zone NOT NULL,
+            end_time timestamp without time zone NOT NULL,
+            CONSTRAINT "Show_pkey" PRIMARY KEY (id),
+            CONSTRAINT "Show_end_after_start" CHECK (end_time > start_time)
+        )
+    ''')
+    op.execute('''
+        INSERT INTO "Show" (id, venue_id, artist_id, start_time, end_time)
+        SELECT id, venue_id, artist_id, start_time, end_time FROM "Show_partitioned"
+    ''')
+    op.execute('ALTER SEQUENCE "Show_id_seq" OWNED BY "Show".id')
+    op.execute('DROP TABLE "Show_partitioned"')
+
+    for name, columns in INDEXES:
+        op.create_index(name, 'Show', columns)
+    # fails if overlapping shows got in across a month boundary: list them
+    # with `flask show-conflicts` first
+    _no_overlap('Show')
@@ -0,0 +1,39 @@
+"""add upcoming show counters to Venue and Artist
+
+Revision ID: c71a9f3e25d8
+Revises: 8b5e0d41c6a2
+Create Date: 2026-10-18 11:26:07.930541
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71a9f3e25d8'
+down_revision = '8b5e0d41c6a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table, fk in (('Venue', 'venue_id'), ('Artist', 'artist_id')):
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_at', sa.DateTime(), nullable=True))
+        # backfill from the existing shows
+        op.get_bind().execute(sa.text(f'''
+            UPDATE "{table}" SET
+                upcoming_shows_count = (SELECT count(*) FROM "Show"
+                    WHERE "Show".{fk} = "{table}".id AND "Show".start_time >= :now),
+                next_show_at = (SELECT min("Show".start_time) FROM "Show"
+                    WHERE "Show".{fk} = "{table}".id AND "Show".start_time >= :now)
+        '''), now=datetime.now())
+
+
+def downgrade():
+    op.drop_column('Artist', 'next_show_at')
+    op.drop_column('Artist', 'upcoming_shows_count')
+    op.drop_column('Venue', 'next_show_at')
+    op.drop_column('Venue', 'upcoming_shows_count')
@@ -0,0 +1,37 @@
+"""store Artist.genres as an array and add GIN indexes on genres
+
+Revision ID: e2a8c45b7d19
+Revises: 5d93b7e1f0ac
+Create Date: 2026-10-18 14:52:48.270934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8c45b7d19'
+down_revision = '5d93b7e1f0ac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Artist.genres was created as VARCHAR(120) while the model maps an
+    # array, so rows hold array literals such as '{Jazz,Folk}'
+    op.alter_column('Artist', 'genres',
+               existing_type=sa.String(length=120),
+               type_=sa.ARRAY(sa.String()),
+               postgresql_using="CASE WHEN genres LIKE '{%' THEN genres::varchar[] "
+                                "ELSE string_to_array(genres, ',') END")
+    op.create_index('ix_Venue_genres', 'Venue', ['genres'], postgresql_using='gin')
+    op.create_index('ix_Artist_genres', 'Artist', ['genres'], postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_Artist_genres', table_name='Artist')
+    op.drop_index('ix_Venue_genres', table_name='Venue')
+    op.alter_column('Artist', 'genres',
+               existing_type=sa.ARRAY(sa.String()),
+               type_=sa.String(length=120),
+               postgresql_using='genres::varchar')
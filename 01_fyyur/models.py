@@ -1,5 +1,6 @@
 # Import dependencies
-from app import db
+from datetime import datetime
+from extensions import db
 
 #----------------------------------------------------------------------------#
 # Models.
@@ -7,6 +8,13 @@ from app import db
 
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    # trigram index for the substring search (Postgres, like the ARRAY genres)
+    __table_args__ = (
+        db.Index('ix_Venue_name_trgm', 'name',
+                 postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Venue_state_city', 'state', 'city'),
+        db.Index('ix_Venue_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -25,11 +33,20 @@ class Venue(db.Model):
     seeking_description = db.Column(db.String)
     shows = db.relationship("Show", backref="Venue",lazy=True)
 
+    # denormalized from Show, see refresh_show_counters()
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime)
+
     def __repr__(self):
         return(f"<Venue {self.name}>")
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.Index('ix_Artist_name_trgm', 'name',
+                 postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_Artist_genres', 'genres', postgresql_using='gin'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String, nullable=False)
@@ -46,15 +63,63 @@ class Artist(db.Model):
     seeking_description = db.Column(db.String())
     shows = db.relationship("Show", backref="artists",lazy=True)
 
+    # denormalized from Show, see refresh_show_counters()
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_show_at = db.Column(db.DateTime)
+
     def __repr__(self):
         return(f"<Artist {self.name}>")
 
 class Show(db.Model):
     __tablename__ = 'Show'
+    # on Postgres the table is partitioned by month of start_time and its
+    # primary key is (id, start_time), see partitions.py; the model keeps id
+    # as the identity, so create_all builds a plain table
+    # access paths: a venue's or an artist's shows by time, and all shows
+    # by time in keyset order (see /shows)
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+        # on Postgres the Show_no_overlap exclusion constraint also keeps a
+        # venue's [start_time, end_time) ranges disjoint, see scheduling.py
+        db.CheckConstraint('end_time > start_time', name='Show_end_after_start'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     venue_id = db.Column(db.Integer, db.ForeignKey("Venue.id"),nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey("Artist.id"),nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
     def __repr__(self):
         return(f"<Show id {self.id}>")
 
+#----------------------------------------------------------------------------#
+# Upcoming-show counters.
+#----------------------------------------------------------------------------#
+
+def _refresh_counters(model, show_fk, condition, now):
+    upcoming = db.and_(show_fk == model.id, Show.start_time >= now)
+    db.session.execute(
+        model.__table__.update().
+        where(condition).
+        values(
+            upcoming_shows_count=db.select([db.func.count(Show.id)]).where(upcoming).as_scalar(),
+            next_show_at=db.select([db.func.min(Show.start_time)]).where(upcoming).as_scalar()
+        )
+    )
+
+def refresh_show_counters(venue_ids=(), artist_ids=(), now=None):
+    # recompute the counters of the given venues and artists from Show;
+    # runs in the caller's transaction, commit together with the show change
+    now = now or datetime.now()
+    if venue_ids:
+        _refresh_counters(Venue, Show.venue_id, Venue.id.in_(venue_ids), now)
+    if artist_ids:
+        _refresh_counters(Artist, Show.artist_id, Artist.id.in_(artist_ids), now)
+
+def rollover_show_counters(now=None):
+    # recompute every venue and artist whose next show has started since the
+    # last refresh, moving those shows from upcoming to past
+    now = now or datetime.now()
+    _refresh_counters(Venue, Show.venue_id, Venue.next_show_at < now, now)
+    _refresh_counters(Artist, Show.artist_id, Artist.next_show_at < now, now)
@@ -0,0 +1,131 @@
+#----------------------------------------------------------------------------#
+# Monthly partitions of Show (Postgres).
+#
+# Since migration b3e9d0c1f7a4, Show is partitioned by range of start_time,
+# one partition per calendar month ("Show_2026_01" holds January 2026) plus
+# "Show_default" for shows outside every month created so far. Queries
+# bounded on start_time (the /shows window and keyset, the upcoming-show
+# counters, the conflict check) only touch the partitions they need.
+#
+#   flask show-partitions                        # months up to SHOW_PARTITIONS_AHEAD
+#   flask show-partitions --archive-before 2024-01
+#   flask show-partitions --archive-before 2024-01 --drop
+#
+# Archiving detaches a month and moves it to the SHOW_ARCHIVE_SCHEMA schema,
+# so its shows leave the app (venue and artist pages included) but the rows
+# are kept. Each partition carries its own copy of the no-overlap exclusion
+# constraint: Postgres cannot enforce one across partitions, so a show that
+# runs over midnight at the end of a month is only checked against the next
+# month by find_venue_conflict() and `flask show-conflicts`.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db, view_cache
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    years, month_index = divmod(month.month - 1 + n, 12)
+    return datetime(month.year + years, month_index + 1, 1)
+
+
+def partition_name(month):
+    return f'Show_{month:%Y_%m}'
+
+
+def partition_month(name):
+    return datetime.strptime(name, 'Show_%Y_%m')
+
+
+def monthly_partitions(connection):
+    # names of the monthly partitions currently attached to Show, oldest first
+    rows = connection.execute('''
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'Show' AND c.relname <> 'Show_default'
+    ''')
+    return sorted(name for name, in rows)
+
+
+def create_partition(connection, month):
+    # built next to the table and attached afterwards, so that shows already
+    # sitting in the default partition for that month can be moved over first
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    connection.execute(f'CREATE TABLE "{name}" (LIKE "Show" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    moved = connection.execute(db.text(f'''
+        WITH moved AS (
+            DELETE FROM "Show_default" WHERE start_time >= :start AND start_time < :end
+            RETURNING id, venue_id, artist_id, start_time, end_time
+        )
+        INSERT INTO "{name}" (id, venue_id, artist_id, start_time, end_time) SELECT * FROM moved
+    '''), start=start, end=end).rowcount
+    connection.execute(f'''
+        ALTER TABLE "{name}" ADD CONSTRAINT "{name}_no_overlap"
+        EXCLUDE USING gist (venue_id WITH =, tsrange(start_time, end_time) WITH &&)
+    ''')
+    connection.execute(f'''
+        ALTER TABLE "Show" ATTACH PARTITION "{name}"
+        FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')
+    ''')
+    return moved
+
+
+def archive_partition(connection, name, schema, drop=False):
+    connection.execute(f'ALTER TABLE "Show" DETACH PARTITION "{name}"')
+    if drop:
+        connection.execute(f'DROP TABLE "{name}"')
+        return
+    # archived shows must not keep their venue or artist from being deleted
+    foreign_keys = connection.execute(db.text('''
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = CAST(:name AS regclass) AND contype = 'f'
+    '''), name=f'"{name}"').fetchall()
+    for constraint, in foreign_keys:
+        connection.execute(f'ALTER TABLE "{name}" DROP CONSTRAINT "{constraint}"')
+    connection.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+    connection.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+
+
+@click.command('show-partitions')
+@click.option('--ahead', type=int, help='Months to create ahead of the current one '
+                                        '[default: SHOW_PARTITIONS_AHEAD].')
+@click.option('--archive-before', metavar='YYYY-MM',
+              help='Detach and archive the months before this one.')
+@click.option('--drop', is_flag=True, help='Drop the archived months instead of keeping them.')
+@with_appcontext
+def show_partitions_command(ahead, archive_before, drop):
+    """Create upcoming monthly Show partitions and archive old ones."""
+    connection = db.session.connection()
+    if connection.dialect.name != 'postgresql':
+        raise click.ClickException('Show is only partitioned on Postgres.')
+    if ahead is None:
+        ahead = current_app.config['SHOW_PARTITIONS_AHEAD']
+
+    existing = set(monthly_partitions(connection))
+    current = month_start(datetime.now())
+    for n in range(ahead + 1):
+        month = add_months(current, n)
+        if partition_name(month) not in existing:
+            moved = create_partition(connection, month)
+            click.echo(f'created {partition_name(month)}' + (f', {moved} shows moved in' if moved else ''))
+
+    if archive_before:
+        cutoff = month_start(datetime.strptime(archive_before, '%Y-%m'))
+        if cutoff > current:
+            raise click.ClickException('only past months can be archived')
+        for name in sorted(existing):
+            if partition_month(name) < cutoff:
+                archive_partition(connection, name, current_app.config['SHOW_ARCHIVE_SCHEMA'], drop)
+                click.echo(f'{"dropped" if drop else "archived"} {name}')
+    db.session.commit()
+    view_cache.bump('show', 'venue', 'artist')
@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------------#
+# Read-replica routing.
+#
+# With SQLALCHEMY_REPLICA_URI set, the replica becomes the 'replica' bind and
+# the session reads from it during GET and HEAD requests. Everything else -
+# writes, the CLI, and every request of a browser session that wrote within
+# the last REPLICA_STICKY_SECONDS - goes to the primary, so users read their
+# own writes however far the replica lags behind. The view cache keys its
+# entries by route as well, so these sessions don't read the replica's data
+# through the cache either.
+#----------------------------------------------------------------------------#
+
+import time
+
+from flask import g, has_request_context, request, session
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def reads_from_replica():
+    return has_request_context() and g.get('db_replica', False)
+
+
+class RoutingSession(SignallingSession):
+
+    def __init__(self, db, **options):
+        self._db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if reads_from_replica():
+            return self._db.get_engine(self.app, bind='replica')
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def init_app(self, app):
+        app.config.setdefault('SQLALCHEMY_REPLICA_URI', None)
+        app.config.setdefault('REPLICA_STICKY_SECONDS', 30)
+        replica_uri = app.config['SQLALCHEMY_REPLICA_URI']
+        if replica_uri:
+            app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, replica=replica_uri)
+        super().init_app(app)
+        if not replica_uri:
+            return
+
+        @app.before_request
+        def choose_database():
+            primary_until = session.get('db_primary_until')
+            if primary_until is not None and primary_until < time.time():
+                session.pop('db_primary_until')
+                primary_until = None
+            g.db_replica = request.method in SAFE_METHODS and primary_until is None
+
+        @app.after_request
+        def stick_to_primary(response):
+            if request.method not in SAFE_METHODS:
+                session['db_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+            if app.debug:
+                response.headers['X-DB-Route'] = 'replica' if reads_from_replica() else 'primary'
+            return response
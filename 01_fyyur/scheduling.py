@@ -0,0 +1,92 @@
+#----------------------------------------------------------------------------#
+# Venue double-booking.
+#
+# A show occupies its venue over [start_time, end_time). On Postgres the
+# Show_no_overlap exclusion constraint (migration a6f04c2d8e31) rejects
+# overlapping shows of the same venue; find_venue_conflict() is the
+# portable check the create handler runs first, and `flask show-conflicts`
+# reports the overlaps already in the table.
+#----------------------------------------------------------------------------#
+
+import heapq
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from extensions import db
+from models import Show
+
+
+class ShowConflict(Exception):
+
+    def __init__(self, show_id=None):
+        super().__init__(show_id)
+        self.show_id = show_id
+
+
+def is_exclusion_violation(error):
+    # the error raised by Show_no_overlap on Postgres: SQLAlchemy's
+    # IntegrityError, or psycopg2's own from a raw cursor (bulk_import.py)
+    return getattr(getattr(error, 'orig', error), 'pgcode', None) == '23P01'
+
+
+def default_end_time(start_time):
+    return start_time + timedelta(minutes=current_app.config['SHOW_DEFAULT_DURATION_MINUTES'])
+
+
+def check_show_times(start_time, end_time):
+    max_duration = timedelta(minutes=current_app.config['SHOW_MAX_DURATION_MINUTES'])
+    if not start_time < end_time <= start_time + max_duration:
+        raise ValueError('a show must end after it starts and last at most '
+                         f'{max_duration} ({start_time} - {end_time})')
+
+
+def find_venue_conflict(venue_id, start_time, end_time):
+    # id of a show of the venue overlapping [start_time, end_time), or None;
+    # shows are at most SHOW_MAX_DURATION_MINUTES long, which bounds the range
+    # scan on the (venue_id, start_time) index from below
+    max_duration = timedelta(minutes=current_app.config['SHOW_MAX_DURATION_MINUTES'])
+    return db.session.query(Show.id).\
+        filter(Show.venue_id == venue_id,
+               Show.start_time > start_time - max_duration,
+               Show.start_time < end_time,
+               Show.end_time > start_time).\
+        limit(1).\
+        scalar()
+
+
+def iter_conflicts(rows):
+    # sweep-line over (venue_id, show_id, start_time, end_time) rows sorted
+    # by venue and start time: a min-heap of the venue's shows still running
+    # at the current start yields exactly the overlapping pairs, in
+    # O(n log n + conflicts) instead of comparing every pair
+    current_venue = None
+    running = []
+    for venue_id, show_id, start_time, end_time in rows:
+        if venue_id != current_venue:
+            current_venue = venue_id
+            running = []
+        while running and running[0][0] <= start_time:
+            heapq.heappop(running)
+        for _, other_id in running:
+            yield venue_id, other_id, show_id
+        heapq.heappush(running, (end_time, show_id))
+
+
+@click.command('show-conflicts')
+@click.option('--venue-id', type=int, help='Only check this venue.')
+@with_appcontext
+def show_conflicts_command(venue_id):
+    """Report overlapping shows at the same venue."""
+    query = db.session.query(Show.venue_id, Show.id, Show.start_time, Show.end_time)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    rows = query.order_by(Show.venue_id, Show.start_time, Show.id).\
+        yield_per(current_app.config['STREAM_BATCH_SIZE'])
+
+    count = 0
+    for count, (venue, first_id, second_id) in enumerate(iter_conflicts(rows), 1):
+        click.echo(f'venue {venue}: show {first_id} overlaps show {second_id}')
+    click.echo(f'{count} conflicts')
@@ -0,0 +1,153 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from app import create_app
+from bulk_import import batch_conflicts
+from scheduling import iter_conflicts
+
+EIGHT_PM = datetime(2026, 11, 6, 20)
+
+
+def hours(start, length):
+    return EIGHT_PM + timedelta(hours=start), EIGHT_PM + timedelta(hours=start + length)
+
+
+def show(venue_id, show_id, start, length=3):
+    return (venue_id, show_id) + hours(start, length)
+
+
+def entry(line_no, venue_id, start, length=3):
+    start_time, end_time = hours(start, length)
+    return line_no, {"venue_id": venue_id, "artist_id": 1, "start_time": start_time, "end_time": end_time}
+
+
+class ConflictsTestCase(unittest.TestCase):
+    """The sweep line of scheduling.py"""
+
+    def conflicts(self, *rows):
+        return list(iter_conflicts(sorted(rows, key=lambda row: (row[0], row[2], row[1]))))
+
+    def test_overlap(self):
+        self.assertEqual(self.conflicts(show(1, 1, 0), show(1, 2, 2)), [(1, 1, 2)])
+
+    def test_touching_shows_do_not_overlap(self):
+        self.assertEqual(self.conflicts(show(1, 1, 0), show(1, 2, 3)), [])
+
+    def test_venues_are_apart(self):
+        self.assertEqual(self.conflicts(show(1, 1, 0), show(2, 2, 0), show(2, 3, 3)), [])
+
+    def test_every_pair_once(self):
+        conflicts = self.conflicts(show(1, 1, 0, 10), show(1, 2, 1), show(1, 3, 2), show(1, 4, 10))
+        self.assertCountEqual(conflicts, [(1, 1, 2), (1, 1, 3), (1, 2, 3)])
+
+
+class BatchConflictsTestCase(unittest.TestCase):
+    """Overlaps of a batch of imported shows (bulk_import.py)"""
+
+    def test_booked_show(self):
+        rejected = batch_conflicts([entry(2, 1, 1), entry(3, 1, 5)], [show(1, 7, 0)])
+        self.assertEqual(rejected, {2: "the venue is already booked (show 7)"})
+
+    def test_booked_show_starting_during_a_row(self):
+        rejected = batch_conflicts([entry(2, 1, 0)], [show(1, 7, 1)])
+        self.assertEqual(rejected, {2: "the venue is already booked (show 7)"})
+
+    def test_overlap_within_the_batch(self):
+        rejected = batch_conflicts([entry(2, 1, 0), entry(3, 1, 2)], [])
+        self.assertEqual(rejected, {3: "overlaps the show on line 2"})
+
+    def test_rejected_row_blocks_nothing(self):
+        # line 4 only overlaps line 3, which is not imported
+        rejected = batch_conflicts([entry(2, 1, 0), entry(3, 1, 2), entry(4, 1, 4)], [])
+        self.assertEqual(rejected, {3: "overlaps the show on line 2"})
+
+    def test_touching_rows(self):
+        self.assertEqual(batch_conflicts([entry(2, 1, 0), entry(3, 1, 3)], [show(1, 7, 6)]), {})
+
+    def test_venues_are_apart(self):
+        rejected = batch_conflicts([entry(2, 1, 0), entry(3, 2, 0), entry(4, 2, 1)], [show(1, 7, 3)])
+        self.assertEqual(rejected, {4: "overlaps the show on line 3"})
+
+
+class ImportTestCase(unittest.TestCase):
+    """Rejected lines of flask import-data"""
+
+    def import_data(self, kind, suffix, text):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        result = create_app().test_cli_runner().invoke(args=["import-data", kind, path])
+        return path, result
+
+    def test_bad_ndjson_lines(self):
+        venue = '"city": "San Francisco", "state": "CA", "address": "1 Main St"'
+        path, result = self.import_data("venues", ".ndjson", "\n".join([
+            '{"name": "The Dive", ' + venue,
+            '[1, 2]',
+            '"The Dive"',
+            '',
+            '{"name": {"first": "The"}, "genres": ["Jazz"], ' + venue + '}',
+            '{"name": "The Dive", "genres": 5, ' + venue + '}',
+            '{"name": "The Dive", "genres": ["Jazz", 3], ' + venue + '}',
+        ]))
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        rejected = [line.split(": ", 1)[0] for line in result.output.splitlines() if line.startswith(path)]
+        self.assertEqual(rejected, [f"{path}:{line_no}" for line_no in (1, 2, 3, 5, 6, 7)])
+        self.assertIn("not a JSON object", result.output)
+        self.assertIn("done: 0 venues", result.output)
+        self.assertIn("6 rejected", result.output)
+
+    def test_bad_show_lines(self):
+        path, result = self.import_data("shows", ".jsonl", "\n".join([
+            '{"venue_name": ["The Dive"], "artist_id": 1, "start_time": "2026-11-06T20:00"}',
+            '{"venue_id": 1, "artist_name": {}, "start_time": "2026-11-06T20:00"}',
+            '{"venue_id": "one", "artist_id": 1, "start_time": "2026-11-06T20:00"}',
+            'null',
+        ]))
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(f"{path}:1: invalid venue_name", result.output)
+        self.assertIn(f"{path}:2: invalid artist_name", result.output)
+        self.assertIn(f"{path}:4: not a JSON object", result.output)
+        self.assertIn("4 rejected", result.output)
+
+
+class TourTestCase(unittest.TestCase):
+    """Request bodies refused by POST /shows/tour before any query"""
+
+    def setUp(self):
+        self.client = create_app().test_client
+
+    def assert_400(self, body, error):
+        res = self.client().post("/shows/tour", data=json.dumps(body), content_type="application/json")
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(data["success"], False)
+        self.assertEqual(data["error"], error)
+
+    def test_400_null_body(self):
+        self.assert_400(None, "the body must be a JSON object")
+
+    def test_400_list_body(self):
+        self.assert_400([], "the body must be a JSON object")
+
+    def test_400_shows_not_a_list(self):
+        self.assert_400({"artist_id": 1, "shows": "2, 2026-11-06 20:00"}, "shows must be a list")
+
+    def test_400_show_not_an_object(self):
+        self.assert_400({"artist_id": 1, "shows": [{"venue_id": 2, "start_time": "2026-11-06 20:00"}, 3]},
+                        "show 2 must be a JSON object")
+
+    def test_400_no_shows(self):
+        self.assert_400({"artist_id": 1}, "no shows given")
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#----------------------------------------------------------------------------#
+# Tour schedules: one artist, many shows in one request.
+#
+# create_tour() checks every stop before anything is written: the venue and
+# artist ids in a single query, the times, and double bookings against the
+# venues' existing shows (one query over the tour's time span) as well as
+# between the stops themselves (the sweep line of scheduling.py). The
+# accepted stops then go in with one multi-row INSERT and one commit.
+#----------------------------------------------------------------------------#
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from extensions import db, view_cache
+from models import Venue, Artist, Show, refresh_show_counters
+from scheduling import ShowConflict, check_show_times, default_end_time, \
+    is_exclusion_violation, iter_conflicts
+
+
+class TourError(ValueError):
+    pass
+
+
+def _stop(line, venue_id, start_time, end_time):
+    return {"line": line, "venue_id": venue_id, "start_time": start_time, "end_time": end_time,
+            "show_id": None, "error": None}
+
+
+def _parse_time(value):
+    import dateutil.parser
+    return dateutil.parser.parse(value) if value else None
+
+
+def parse_stops(text):
+    # one stop per line of the form field: venue_id, start time[, end time]
+    stops = []
+    for line, row in enumerate(text.splitlines(), 1):
+        if not row.strip():
+            continue
+        fields = [field.strip() for field in row.split(',')]
+        stops.append(stop_from_fields(line, *fields[:3]))
+    return stops
+
+
+def tour_from_json(payload):
+    # (artist_id, stops, skip_invalid) of a JSON request body
+    if not isinstance(payload, dict):
+        raise TourError('the body must be a JSON object')
+    items = payload.get('shows') or []
+    if not isinstance(items, list):
+        raise TourError('shows must be a list')
+    for line, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise TourError(f'show {line} must be a JSON object')
+    return payload.get('artist_id'), stops_from_json(items), bool(payload.get('skip_invalid'))
+
+
+def stops_from_json(items):
+    return [stop_from_fields(line, item.get('venue_id'), item.get('start_time'), item.get('end_time'))
+            for line, item in enumerate(items, 1)]
+
+
+def stop_from_fields(line, venue_id, start_time=None, end_time=None):
+    stop = _stop(line, venue_id, start_time, end_time)
+    try:
+        stop["venue_id"] = int(venue_id)
+        stop["start_time"] = _parse_time(start_time)
+        if stop["start_time"] is None:
+            raise ValueError('start time is required')
+        stop["end_time"] = _parse_time(end_time) or default_end_time(stop["start_time"])
+        check_show_times(stop["start_time"], stop["end_time"])
+    except (TypeError, ValueError, OverflowError) as e:
+        stop["error"] = str(e) or 'invalid stop'
+    return stop
+
+
+def stop_as_json(stop):
+    return dict(stop, **{key: stop[key].isoformat() for key in ('start_time', 'end_time')
+                         if isinstance(stop[key], datetime)})
+
+
+def check_references(artist_id, stops):
+    # the artist and every venue of the tour, in a single query
+    venue_ids = {stop["venue_id"] for stop in stops if stop["error"] is None}
+    known = db.session.query(db.literal('venue'), Venue.id).filter(Venue.id.in_(venue_ids)).\
+        union_all(db.session.query(db.literal('artist'), Artist.id).filter(Artist.id == artist_id)).\
+        all()
+    if ('artist', artist_id) not in known:
+        raise TourError(f'unknown artist: {artist_id}')
+    for stop in stops:
+        if stop["error"] is None and ('venue', stop["venue_id"]) not in known:
+            stop["error"] = f'unknown venue: {stop["venue_id"]}'
+
+
+def check_conflicts(stops):
+    # the stops get negative ids so that they can run through the same sweep
+    # line as the shows already booked at those venues
+    valid = [stop for stop in stops if stop["error"] is None]
+    if not valid:
+        return
+    max_duration = timedelta(minutes=current_app.config['SHOW_MAX_DURATION_MINUTES'])
+    rows = db.session.query(Show.venue_id, Show.id, Show.start_time, Show.end_time).\
+        filter(Show.venue_id.in_({stop["venue_id"] for stop in valid}),
+               Show.start_time > min(stop["start_time"] for stop in valid) - max_duration,
+               Show.start_time < max(stop["end_time"] for stop in valid)).\
+        all()
+    rows += [(stop["venue_id"], -i, stop["start_time"], stop["end_time"]) for i, stop in enumerate(stops, 1)
+             if stop["error"] is None]
+    rows.sort(key=lambda row: (row[0], row[2], row[1]))
+
+    for _, first_id, second_id in iter_conflicts(rows):
+        for show_id, other_id in ((first_id, second_id), (second_id, first_id)):
+            if show_id < 0 and stops[-show_id - 1]["error"] is None:
+                stops[-show_id - 1]["error"] = \
+                    f'overlaps the stop on line {stops[-other_id - 1]["line"]}' if other_id < 0 else \
+                    f'the venue is already booked (show {other_id})'
+
+
+def insert_shows(artist_id, stops):
+    values = [{"venue_id": stop["venue_id"], "artist_id": artist_id,
+               "start_time": stop["start_time"], "end_time": stop["end_time"]} for stop in stops]
+    table = Show.__table__
+    if db.session.connection().dialect.name == 'postgresql':
+        # one multi-row INSERT ... RETURNING; the ids are matched back on
+        # (venue, start), which the overlap check made unique
+        rows = db.session.execute(table.insert().values(values).
+                                  returning(table.c.id, table.c.venue_id, table.c.start_time))
+        ids = {(venue_id, start_time): show_id for show_id, venue_id, start_time in rows}
+        for stop in stops:
+            stop["show_id"] = ids[(stop["venue_id"], stop["start_time"])]
+    else:
+        for stop, value in zip(stops, values):
+            stop["show_id"] = db.session.execute(table.insert().values(value)).inserted_primary_key[0]
+
+
+def create_tour(artist_id, stops, skip_invalid=False):
+    # returns the number of shows created; each stop gets its show_id or its
+    # error. Unless skip_invalid, one bad stop means no show is created.
+    try:
+        artist_id = int(artist_id)
+    except (TypeError, ValueError):
+        raise TourError('artist_id is required')
+    if not stops:
+        raise TourError('no shows given')
+    if len(stops) > current_app.config['TOUR_MAX_SHOWS']:
+        raise TourError(f'at most {current_app.config["TOUR_MAX_SHOWS"]} shows per tour')
+
+    check_references(artist_id, stops)
+    check_conflicts(stops)
+    accepted = [stop for stop in stops if stop["error"] is None]
+    if not accepted or (len(accepted) < len(stops) and not skip_invalid):
+        db.session.rollback()
+        return 0
+
+    venue_ids = {stop["venue_id"] for stop in accepted}
+    try:
+        insert_shows(artist_id, accepted)
+        refresh_show_counters(venue_ids=venue_ids, artist_ids=[artist_id])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for stop in accepted:
+            stop["show_id"] = None
+        # another booking got in between the check and the insert
+        if is_exclusion_violation(e):
+            raise ShowConflict()
+        raise
+    view_cache.bump('show', f'artist:{artist_id}', *[f'venue:{venue_id}' for venue_id in venue_ids])
+    return len(accepted)
@@ -0,0 +1,15 @@
+#----------------------------------------------------------------------------#
+# WSGI entry point.
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# With preload_app on (gunicorn.conf.py) this module is imported once, in
+# the master: the app, the modules it pulls in and the caches warmed by
+# preload() are then shared copy-on-write by every forked worker, which
+# starts serving without importing anything itself.
+#----------------------------------------------------------------------------#
+
+from app import create_app, preload
+
+app = create_app()
+preload()
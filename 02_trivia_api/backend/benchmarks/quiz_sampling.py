@@ -0,0 +1,101 @@
+'''
+Latency of drawing the next quiz question, across bank sizes: POST
+/quizzes (question_ids.sample() plus one primary-key fetch) against the
+former approach of loading every unseen question of the category and
+picking one in Python.
+
+  python -m benchmarks.quiz_sampling [--sizes 1000,10000,100000,1000000]
+  python -m benchmarks.quiz_sampling --database postgresql://.../trivia_bench
+
+Each size empties the questions table of the given database and fills it
+with synthetic questions spread over the six categories, so point it at a
+scratch database. A game asks --rounds questions of one category (or all
+of them), passing the ids already asked as previous_questions. The former
+approach is skipped above --legacy-max-size, where it takes seconds.
+'''
+
+import argparse
+import random
+import statistics
+import time
+
+from flaskr import create_app
+from models import database_path, db, question_ids, Question
+
+CATEGORIES = ['1', '2', '3', '4', '5', '6']
+
+
+def load(size, batch_size=10000):
+    db.session.query(Question).delete()
+    db.session.commit()
+    rng = random.Random(size)
+    for start in range(0, size, batch_size):
+        db.session.execute(Question.__table__.insert(), [{
+            "question": f"Synthetic question {i}?",
+            "answer": f"Answer {i}",
+            "category": rng.choice(CATEGORIES),
+            "difficulty": rng.randint(1, 5)
+        } for i in range(start, min(start + batch_size, size))])
+    db.session.commit()
+
+
+def legacy_pick(category, previous):
+    # what /quizzes did before question_ids
+    query = Question.query
+    if category is not None:
+        query = query.filter_by(category=category)
+    available = query.filter(Question.id.notin_(previous)).all()
+    return available[random.randrange(len(available))].format() if available else None
+
+
+def play(ask, rng, games, rounds):
+    latencies = []
+    for _ in range(games):
+        category = rng.choice(CATEGORIES + [None])
+        previous = []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            question = ask(category, previous)
+            latencies.append(time.perf_counter() - started)
+            if question is None:
+                break
+            previous.append(question["id"])
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark quiz question selection.')
+    parser.add_argument('--database', default=database_path)
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000')
+    parser.add_argument('--games', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--legacy-max-size', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+    client = app.test_client()
+
+    def ask(category, previous):
+        quiz_category = {"type": "click", "id": 0} if category is None else {"type": "", "id": int(category)}
+        res = client.post("/quizzes", json={"previous_questions": previous, "quiz_category": quiz_category})
+        return res.get_json()["question"] if res.status_code == 200 else None
+
+    print(f'{"questions":>10} {"path":<8} {"p50 ms":>9} {"p95 ms":>9}')
+    with app.app_context():
+        for size in [int(size) for size in args.sizes.split(',')]:
+            load(size)
+            # the ids are loaded once per worker, not on every draw
+            question_ids.invalidate()
+            question_ids.sample()
+            paths = [('sample', ask)]
+            if size <= args.legacy_max_size:
+                paths.append(('legacy', legacy_pick))
+            for name, path in paths:
+                latencies = sorted(play(path, random.Random(args.seed), args.games, args.rounds))
+                print(f'{size:>10} {name:<8} {statistics.median(latencies) * 1000:9.2f} '
+                      f'{latencies[int(len(latencies) * 0.95)] * 1000:9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,46 @@
 import os
 from flask import Flask, request, abort, jsonify
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
 from flask_cors import CORS
-import random
-from models import setup_db, Question, Category
+from models import setup_db, database_path, db, Question, category_cache, question_ids
+from search import search_questions, init_search_command
+from quiz_sessions import QuizSessions, SessionNotFound
 
 QUESTIONS_PER_PAGE = 10
 
-def paginate(request,selection,items_per_page):
-    page = request.args.get('page', 1, type=int)
-    start = (page-1)*items_per_page
-    end = start + items_per_page
-    elements = [el.format() for el in selection]
-    current_elements = elements[start:end]
-    return(current_elements)
+quiz_sessions = QuizSessions()
+
+'''
+paginate(request, query, items_per_page, order_by=None)
+    one page of a Question query, sliced in SQL, and the size of the whole
+    selection from a separate COUNT. ?page=N pages with LIMIT/OFFSET;
+    ?after=<question id> starts right after that question with a keyset
+    condition instead, which costs the same however deep the page is.
+    Queries with their own order_by (ranked searches) only take ?page.
+'''
+def paginate(request,query,items_per_page,order_by=None):
+    total = query.order_by(None).with_entities(func.count(Question.id)).scalar()
+    after = request.args.get('after', None, type=int)
+    if after is not None and order_by is None:
+        query = query.filter(Question.id > after).order_by(Question.id)
+    else:
+        page = request.args.get('page', 1, type=int)
+        if page < 1:
+            return([], total)
+        ordering = (Question.id,) if order_by is None else (order_by, Question.id)
+        query = query.order_by(*ordering).offset((page-1)*items_per_page)
+    current_elements = [el.format() for el in query.limit(items_per_page)]
+    return(current_elements, total)
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
-  setup_db(app)
+  if test_config is not None:
+    app.config.from_mapping(test_config)
+  setup_db(app, app.config.get("SQLALCHEMY_DATABASE_URI", database_path))
+  quiz_sessions.init_app(app)
+  app.cli.add_command(init_search_command)
 
   cors = CORS(app)#, resources={r"*": {"origins": "*"}})
 
@@ -31,14 +53,18 @@ def create_app(test_config=None):
 
   @app.route('/categories',methods = ["GET"])
   def retrieve_categories():
-      categories = Category.query.order_by("id").all()
+      categories, etag = category_cache.get()
       if len(categories)==0:
           abort(404)
       
-      return(jsonify({
+      response = jsonify({
           "success":True,
-          "categories": {category.id: category.type for category in categories}
-      }))
+          "categories": categories
+      })
+      #Let the frontend revalidate its copy: 304 while the map is unchanged
+      response.set_etag(etag)
+      response.cache_control.no_cache = True
+      return response.make_conditional(request)
 
 
   '''
@@ -54,9 +80,8 @@ def create_app(test_config=None):
   '''
   @app.route("/questions",methods = ["GET"])
   def retrieve_questions():
-    selection = Question.query.order_by("id").all()
-    current_questions = paginate(request,selection,QUESTIONS_PER_PAGE)
-    categories = Category.query.order_by("id").all()
+    current_questions, total = paginate(request,Question.query,QUESTIONS_PER_PAGE)
+    categories, _ = category_cache.get()
 
     if len(current_questions)==0:
       abort(404)
@@ -64,19 +89,18 @@ def create_app(test_config=None):
     return(jsonify({
         "success":True,
         "questions":current_questions,
-        "total_questions":len(selection),
-        "categories":{category.id: category.type for category in categories},
+        "total_questions":total,
+        "categories":categories,
         "current_category":None
     }))
   
   @app.route("/categories/<int:category_id>/questions",methods = ["GET"])
   def retrieve_question(category_id):
     
-    categories = Category.query.order_by("id").all()
-    categories = {category.id:category.type  for category in categories}
+    categories, _ = category_cache.get()
     
-    selection = Question.query.filter(Question.category == str(category_id)).all()
-    current_questions = paginate(request,selection,QUESTIONS_PER_PAGE)
+    selection = Question.query.filter(Question.category == str(category_id))
+    current_questions, total = paginate(request,selection,QUESTIONS_PER_PAGE)
     
     if len(current_questions)==0:
       abort(404)
@@ -84,7 +108,7 @@ def create_app(test_config=None):
     return(jsonify({
         "success":True,
         "questions":current_questions,
-        "total_questions":len(selection),
+        "total_questions":total,
         "categories":categories,
         "current_category":categories[category_id]
     }))
@@ -149,16 +173,14 @@ def create_app(test_config=None):
     if not search_term:
       abort(400)
 
-    selection = Question.query.filter(Question.question.ilike(f"%{search_term}%")).all()
-    current_questions = paginate(request,selection,QUESTIONS_PER_PAGE)
-
-    if selection is None:
-      abort(404)
+    #Ranked full-text search of the questions, and of the answers with searchAnswers
+    selection, rank = search_questions(db,Question,search_term,bool(body.get("searchAnswers")))
+    current_questions, total = paginate(request,selection,QUESTIONS_PER_PAGE,rank)
 
     return(jsonify({
         "success":True,
         "questions":current_questions,
-        "total_questions":len(selection),
+        "total_questions":total,
         "current_category":None
     }))
 
@@ -177,25 +199,82 @@ def create_app(test_config=None):
     previous_questions = body.get("previous_questions",None)
     category = body.get("quiz_category",None)
 
-    #Retrieve all questions from the given category that are not in previous_questions
-    if category['type'] == 'click':
-      available_questions = Question.query.filter(
-          Question.id.notin_((previous_questions))).all()
-    else:
-      available_questions = Question.query.filter_by(
-          category=category['id']).filter(Question.id.notin_((previous_questions))).all()
-    #Return random question
-    print(available_questions)
-    if available_questions:
-      idx = random.randrange(len(available_questions))
-      return(jsonify({
+    #Draw a random unseen question id of the category, then fetch only that
+    #question; an id deleted by another worker reloads the ids and draws again
+    category_id = None if category['type'] == 'click' else category['id']
+    for _ in range(3):
+      question_id = question_ids.sample(category_id, previous_questions or ())
+      if question_id is None:
+        abort(422)
+      question = Question.query.get(question_id)
+      if question is not None:
+        return(jsonify({
             "success":True,
-            "question":available_questions[idx].format()
+            "question":question.format()
             }))
-    else:
+      question_ids.invalidate()
+
+    #Ids still churning after three draws: pick an unseen question in SQL
+    query = Question.query.filter(Question.id.notin_(previous_questions or ()))
+    if category_id is not None:
+      query = query.filter(Question.category == str(category_id))
+    question = query.order_by(func.random()).first()
+    if question is None:
       abort(422)
+    return(jsonify({
+        "success":True,
+        "question":question.format()
+        }))
       
 
+  '''
+  Quiz sessions: the server deals a shuffled deck of question ids once, and
+  each round pops the next one, instead of the client resending
+  previous_questions (see quiz_sessions.py).
+  '''
+  @app.route("/quizzes/sessions",methods = ["POST"])
+  def start_quiz_session():
+    body = request.get_json() or {}
+    category = body.get("quiz_category",None)
+    if category is None:
+      abort(400)
+
+    category_id = None if category['type'] == 'click' else category['id']
+    token, total = quiz_sessions.start(question_ids.ids(category_id))
+    if total == 0:
+      quiz_sessions.end(token)
+      abort(422)
+
+    return(jsonify({
+        "success":True,
+        "session":token,
+        "total_questions":total
+    }))
+
+  @app.route("/quizzes/sessions/<token>/next",methods = ["POST"])
+  def next_quiz_question(token):
+    #Skip the ids of questions deleted since the deck was dealt
+    while True:
+      try:
+        question_id = quiz_sessions.next(token)
+      except SessionNotFound:
+        abort(404)
+      if question_id is None:
+        abort(422)
+      question = Question.query.get(question_id)
+      if question is not None:
+        return(jsonify({
+            "success":True,
+            "question":question.format()
+        }))
+
+  @app.route("/quizzes/sessions/<token>",methods = ["DELETE"])
+  def end_quiz_session(token):
+    quiz_sessions.end(token)
+    return(jsonify({
+        "success":True
+    }))
+
   '''
   Error handlers
   '''
@@ -0,0 +1,126 @@
+'''
+Server-side quiz sessions
+    POST /quizzes/sessions deals a shuffled deck of at most
+    QUIZ_SESSION_QUESTIONS question ids for the category and returns a
+    token; every POST /quizzes/sessions/<token>/next then pops the next id
+    off the deck. The client no longer resends the questions it has seen,
+    and a round costs the same however long the game has run.
+
+    Decks live in a bounded store: 'memory' (per worker, LRU over
+    QUIZ_SESSION_MAX sessions) or 'redis' (shared between workers, needs
+    the redis package and QUIZ_SESSION_REDIS_URL). Either way a session
+    expires QUIZ_SESSION_TTL seconds after its last round.
+'''
+
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class SessionNotFound(KeyError):
+    pass
+
+
+class MemoryStore(object):
+
+    def __init__(self, max_sessions, ttl):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._decks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, token, ids):
+        with self._lock:
+            # the deck is popped from the end
+            self._decks[token] = (time.monotonic(), list(reversed(ids)))
+            while len(self._decks) > self.max_sessions:
+                self._decks.popitem(last=False)
+
+    def next(self, token):
+        # the next id of the deck, None once it is used up
+        with self._lock:
+            entry = self._decks.get(token)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._decks.pop(token, None)
+                raise SessionNotFound(token)
+            self._decks[token] = (time.monotonic(), entry[1])
+            self._decks.move_to_end(token)
+            return entry[1].pop() if entry[1] else None
+
+    def end(self, token):
+        with self._lock:
+            self._decks.pop(token, None)
+
+
+class RedisStore(object):
+    # a list per session; a trailing 0 marks the end of the deck, so that a
+    # used-up deck can be told from an expired one
+
+    def __init__(self, url, ttl, prefix='trivia:quiz:'):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def start(self, token, ids):
+        pipe = self._redis.pipeline()
+        pipe.rpush(self.prefix + token, *ids, 0)
+        pipe.expire(self.prefix + token, self.ttl)
+        pipe.execute()
+
+    def next(self, token):
+        pipe = self._redis.pipeline()
+        pipe.lpop(self.prefix + token)
+        pipe.expire(self.prefix + token, self.ttl)
+        value = pipe.execute()[0]
+        if value is None:
+            raise SessionNotFound(token)
+        if int(value) == 0:
+            self._redis.rpush(self.prefix + token, 0)
+            self._redis.expire(self.prefix + token, self.ttl)
+            return None
+        return int(value)
+
+    def end(self, token):
+        self._redis.delete(self.prefix + token)
+
+
+class QuizSessions(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('QUIZ_SESSION_STORE', 'memory')
+        app.config.setdefault('QUIZ_SESSION_TTL', 3600)
+        app.config.setdefault('QUIZ_SESSION_MAX', 10000)
+        app.config.setdefault('QUIZ_SESSION_QUESTIONS', 50)
+        app.config.setdefault('QUIZ_SESSION_REDIS_URL', 'redis://localhost:6379/0')
+        if app.config['QUIZ_SESSION_STORE'] == 'redis':
+            store = RedisStore(app.config['QUIZ_SESSION_REDIS_URL'], app.config['QUIZ_SESSION_TTL'])
+        else:
+            store = MemoryStore(app.config['QUIZ_SESSION_MAX'], app.config['QUIZ_SESSION_TTL'])
+        app.extensions['quiz_sessions'] = store
+
+    @property
+    def store(self):
+        return current_app.extensions['quiz_sessions']
+
+    def start(self, ids):
+        # deals the deck from the question ids of the category; returns the
+        # token and the number of questions in the deck
+        deck = random.sample(ids, min(len(ids), current_app.config['QUIZ_SESSION_QUESTIONS']))
+        token = secrets.token_urlsafe(16)
+        self.store.start(token, deck)
+        return token, len(deck)
+
+    def next(self, token):
+        return self.store.next(token)
+
+    def end(self, token):
+        self.store.end(token)
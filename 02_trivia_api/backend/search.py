@@ -0,0 +1,166 @@
+'''
+Full-text question search
+    flask init-search installs the schema once per database, idempotently
+    (it takes an exclusive lock on questions, so run it like a migration,
+    not while the app serves). On Postgres it adds two tsvector columns to
+    questions - question_tsv (the question) and document_tsv (the question,
+    weight A, and the answer, weight B) - kept up to date by a trigger and
+    indexed with GIN, and fills them in for the existing rows. On SQLite
+    it adds an external-content FTS5 table kept in step by triggers, so the
+    test suite runs without Postgres.
+
+    At startup setup_db only runs detect(engine), a catalog lookup, to pick
+    the ranking path. Without the schema, elsewhere, or without FTS5,
+    searches fall back to ILIKE.
+
+    search_questions() returns the matching questions query and its ORDER
+    BY, best rank first. Every word of the term has to match, as a prefix;
+    on Postgres a term made only of stop words is matched with ILIKE.
+'''
+
+import re
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import OperationalError
+
+_WORDS = re.compile(r'\w+')
+
+_POSTGRES_SCHEMA = [
+    'ALTER TABLE questions ADD COLUMN IF NOT EXISTS question_tsv tsvector',
+    'ALTER TABLE questions ADD COLUMN IF NOT EXISTS document_tsv tsvector',
+    '''
+    CREATE OR REPLACE FUNCTION questions_tsv_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.question_tsv := to_tsvector('english', coalesce(NEW.question, ''));
+        NEW.document_tsv := setweight(NEW.question_tsv, 'A')
+            || setweight(to_tsvector('english', coalesce(NEW.answer, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'questions_tsv_update') THEN
+            CREATE TRIGGER questions_tsv_update BEFORE INSERT OR UPDATE OF question, answer
+            ON questions FOR EACH ROW EXECUTE PROCEDURE questions_tsv_update();
+        END IF;
+    END
+    $$
+    ''',
+    # rows from before the trigger get their vectors through it
+    'UPDATE questions SET question = question WHERE question_tsv IS NULL',
+    'CREATE INDEX IF NOT EXISTS questions_question_tsv ON questions USING gin (question_tsv)',
+    'CREATE INDEX IF NOT EXISTS questions_document_tsv ON questions USING gin (document_tsv)',
+]
+
+_SQLITE_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+        question, answer, content='questions', content_rowid='id', tokenize='porter unicode61')
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS questions_fts_insert AFTER INSERT ON questions BEGIN
+        INSERT INTO questions_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS questions_fts_delete AFTER DELETE ON questions BEGIN
+        INSERT INTO questions_fts(questions_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS questions_fts_update AFTER UPDATE OF question, answer ON questions BEGIN
+        INSERT INTO questions_fts(questions_fts, rowid, question, answer)
+        VALUES ('delete', old.id, old.question, old.answer);
+        INSERT INTO questions_fts(rowid, question, answer) VALUES (new.id, new.question, new.answer);
+    END
+    ''',
+]
+
+
+def detect(engine):
+    # the search backend whose schema is installed: 'postgresql', 'sqlite'
+    # or None; reads the catalog only, so it never waits on a table lock
+    dialect = engine.dialect.name
+    if dialect == 'postgresql':
+        statement = ("SELECT 1 FROM information_schema.columns "
+                     "WHERE table_name = 'questions' AND column_name = 'question_tsv'")
+    elif dialect == 'sqlite':
+        statement = "SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'"
+    else:
+        return None
+    with engine.connect() as connection:
+        found = connection.execute(statement).first() is not None
+    return dialect if found else None
+
+
+def install(engine):
+    # returns the search backend installed: 'postgresql', 'sqlite' or None
+    dialect = engine.dialect.name
+    with engine.begin() as connection:
+        if dialect == 'postgresql':
+            for statement in _POSTGRES_SCHEMA:
+                connection.execute(statement)
+            return dialect
+        if dialect == 'sqlite':
+            created = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'questions_fts'").first() is None
+            try:
+                for statement in _SQLITE_SCHEMA:
+                    connection.execute(statement)
+            except OperationalError:
+                # an SQLite built without FTS5
+                return None
+            if created:
+                connection.execute("INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')")
+            return dialect
+    return None
+
+
+@click.command('init-search')
+@with_appcontext
+def init_search_command():
+    """Install the full-text search schema of the questions."""
+    backend = install(current_app.extensions['sqlalchemy'].db.engine)
+    current_app.extensions['question_search'] = backend
+    if backend is None:
+        click.echo('no full-text search for this database: searches use ILIKE')
+    else:
+        click.echo(f'{backend} full-text search installed')
+
+
+def search_questions(db, Question, term, answers=False):
+    # (query, order_by) of the questions matching term, in the question
+    # or, with answers, in the question or the answer
+    words = _WORDS.findall(term)
+    backend = current_app.extensions.get('question_search')
+    if backend == 'postgresql' and words:
+        vector = db.literal_column('questions.document_tsv' if answers else 'questions.question_tsv')
+        tsquery = db.func.to_tsquery('english', ' & '.join(f'{word}:*' for word in words))
+        # a term of stop words only gives an empty tsquery, which matches
+        # nothing: that one falls back to ILIKE. The test is on a constant,
+        # so the planner folds it and keeps the GIN index for the rest.
+        condition = vector.op('@@')(tsquery) | \
+            ((db.func.numnode(tsquery) == 0) & _ilike(Question, term, answers))
+        return Question.query.filter(condition), db.func.ts_rank_cd(vector, tsquery).desc()
+    if backend == 'sqlite' and words:
+        match = ' AND '.join(f'"{word}"*' for word in words)
+        if not answers:
+            match = f'question : ({match})'
+        fts = db.table('questions_fts', db.column('rowid'), db.column('rank'))
+        query = Question.query.join(fts, fts.c.rowid == Question.id).\
+            filter(db.literal_column('questions_fts').op('MATCH')(match))
+        # bm25, lower is better
+        return query, fts.c.rank
+    return Question.query.filter(_ilike(Question, term, answers)), None
+
+
+def _ilike(Question, term, answers):
+    condition = Question.question.ilike(f'%{term}%')
+    if answers:
+        condition = condition | Question.answer.ilike(f'%{term}%')
+    return condition
@@ -10,6 +10,7 @@ class QuizView extends Component {
     super();
     this.state = {
         quizCategory: null,
+        quizSession: null,
         previousQuestions: [], 
         showAnswer: false,
         categories: {},
@@ -36,7 +37,29 @@ class QuizView extends Component {
   }
 
   selectCategory = ({type, id=0}) => {
-    this.setState({quizCategory: {type, id}}, this.getNextQuestion)
+    // the server deals the questions of the game once and keeps track of
+    // them; each round only sends the session token
+    $.ajax({
+      url: '/quizzes/sessions',
+      type: "POST",
+      dataType: 'json',
+      contentType: 'application/json',
+      data: JSON.stringify({
+        quiz_category: {type, id}
+      }),
+      xhrFields: {
+        withCredentials: true
+      },
+      crossDomain: true,
+      success: (result) => {
+        this.setState({quizCategory: {type, id}, quizSession: result.session}, this.getNextQuestion)
+        return;
+      },
+      error: (error) => {
+        alert('Unable to start the quiz. Please try your request again')
+        return;
+      }
+    })
   }
 
   handleChange = (event) => {
@@ -48,14 +71,9 @@ class QuizView extends Component {
     if(this.state.currentQuestion.id) { previousQuestions.push(this.state.currentQuestion.id) }
 
     $.ajax({
-      url: '/quizzes', //TODO: update request URL
+      url: `/quizzes/sessions/${this.state.quizSession}/next`,
       type: "POST",
       dataType: 'json',
-      contentType: 'application/json',
-      data: JSON.stringify({
-        previous_questions: previousQuestions,
-        quiz_category: this.state.quizCategory
-      }),
       xhrFields: {
         withCredentials: true
       },
@@ -71,6 +89,11 @@ class QuizView extends Component {
         return;
       },
       error: (error) => {
+        if (error.status === 422) {
+          // every question of the deck was asked
+          this.setState({previousQuestions: previousQuestions, forceEnd: true})
+          return;
+        }
         alert('Unable to load question. Please try your request again')
         return;
       }
@@ -90,6 +113,7 @@ class QuizView extends Component {
   restartGame = () => {
     this.setState({
       quizCategory: null,
+      quizSession: null,
       previousQuestions: [], 
       showAnswer: false,
       numCorrect: 0,
@@ -0,0 +1,126 @@
+'''
+Per-request SQL statistics
+    opt-in with SQL_STATS_ENABLED (config or environment). Counts the
+    statements each request runs and the time spent in them, and groups
+    them by shape - the SQL with literals and IN lists folded - so that a
+    SELECT repeated with different ids (N+1) stands out. In debug the
+    numbers go to X-SQL-* / Server-Timing headers; every request is also
+    logged, with a warning per shape repeated more than
+    SQL_STATS_N_PLUS_ONE_THRESHOLD times.
+
+    Copied from 01_fyyur/query_stats.py, the canonical version: change
+    that one first and keep the copies in sync.
+'''
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \([^()]*\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    shape = _LITERALS.sub('?', statement)
+    shape = _IN_LISTS.sub('IN (...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class RequestQueries(object):
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.status = None
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        # the SELECT shapes run more than threshold times, most frequent first
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count > threshold and shape[:6].upper() == 'SELECT']
+
+
+def _current():
+    return g.get('query_stats') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current() is not None:
+        context._query_stats_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_stats_started', None)
+    stats = _current()
+    if started is not None and stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+class QueryStats(object):
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if 'query_stats' in app.extensions:
+            return
+        app.extensions['query_stats'] = self
+        app.config.setdefault('SQL_STATS_ENABLED', os.environ.get('SQL_STATS_ENABLED') == '1')
+        app.config.setdefault('SQL_STATS_N_PLUS_ONE_THRESHOLD', 10)
+        if not app.config['SQL_STATS_ENABLED']:
+            return
+        # the line per request is logged at INFO, below the default WARNING
+        # level of app.logger
+        if app.logger.getEffectiveLevel() > logging.INFO:
+            app.logger.setLevel(logging.INFO)
+
+        # one listener pair for every engine; statements run outside a
+        # request are ignored
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        threshold = app.config['SQL_STATS_N_PLUS_ONE_THRESHOLD']
+
+        @app.before_request
+        def start_query_stats():
+            g.query_stats = RequestQueries()
+
+        @app.after_request
+        def add_query_stats_headers(response):
+            stats = _current()
+            if stats is None:
+                return response
+            stats.status = response.status_code
+            if app.debug:
+                response.headers['X-SQL-Queries'] = str(stats.count)
+                response.headers['Server-Timing'] = f'db;dur={stats.duration * 1000:.1f}'
+                repeated = stats.repeated(threshold)
+                if repeated:
+                    shape, count = repeated[0]
+                    response.headers['X-SQL-N-Plus-One'] = f'{count}x {shape[:200]}'
+            return response
+
+        # after the response, so that streamed bodies are counted too
+        @app.teardown_request
+        def log_query_stats(error=None):
+            stats = _current()
+            if stats is None:
+                return
+            app.logger.info('%s %s %s: %d queries, %.1f ms in the database', request.method,
+                            request.full_path.rstrip('?'), stats.status, stats.count, stats.duration * 1000)
+            for shape, count in stats.repeated(threshold):
+                app.logger.warning('possible N+1 in %s %s: %d x %s', request.method, request.path, count, shape)